@@ -1,7 +1,14 @@
+import argparse
+import heapq
 import random
 import pandas as pd
 import json
 
+parser = argparse.ArgumentParser(description="生成课程、学生、教师与辅导课程表")
+parser.add_argument('--seed', type=int, help="随机种子，指定后结果可复现")
+args = parser.parse_args()
+random.seed(args.seed)
+
 # 1. 定义课程列表 (至少 60 门)
 courses_data = [
     {'Course Code': 'CS101', 'Course Title': '计算机科学导论', 'Description': '介绍计算机科学基本概念、编程基础和问题解决。', 'Level': '本科一年级', 'Department': '计算机科学', 'Difficulty': '入门'},
@@ -96,42 +103,103 @@ for teacher, expertise in teacher_expertise.items():
     teacher_courses[teacher] = random.sample(possible_courses, num_assign)
 
 # 4. 分配学生选课 (每人 1-5 门，每门至少 3 人)
+min_students_per_course = 3
+max_courses_per_student = 5
+course_codes = courses_df['Course Code'].tolist()
+# 可行当且仅当：学生数不少于每门课的最少人数，且全部选课名额足以覆盖所有课程的最少人数
+if num_students < min_students_per_course or num_students * max_courses_per_student < num_courses * min_students_per_course:
+    raise ValueError(
+        f"无法满足每人最多 {max_courses_per_student} 门、每门至少 {min_students_per_course} 人的要求："
+        f"{num_students} 名学生最多 {num_students * max_courses_per_student} 个选课名额，"
+        f"{num_courses} 门课程至少需要 {num_courses * min_students_per_course} 个，且学生数需不少于 {min_students_per_course}"
+    )
+
 student_courses = {student: [] for student in students}
-course_enrollment = {code: 0 for code in courses_df['Course Code']}
+course_enrollment = {code: 0 for code in course_codes}
 
 # 初始随机分配
 for student in students:
-    num_courses_to_enroll = random.randint(1, 5)
-    possible_courses = courses_df['Course Code'].tolist()
-    enrolled_courses = random.sample(possible_courses, min(num_courses_to_enroll, len(possible_courses)))
+    num_courses_to_enroll = random.randint(1, max_courses_per_student)
+    enrolled_courses = random.sample(course_codes, min(num_courses_to_enroll, len(course_codes)))
     student_courses[student] = enrolled_courses
     for course_code in enrolled_courses:
         course_enrollment[course_code] += 1
 
-# 迭代调整以满足每门课程至少 3 人选修
-max_iterations = 100  # 设置最大迭代次数以防止无限循环
-iteration = 0
-while any(count < 3 for count in course_enrollment.values()) and iteration < max_iterations:
-    iteration += 1
-    unmet_courses = [code for code, count in course_enrollment.items() if count < 3]
-    if not unmet_courses:
-        break
-
-    # 找到一个选课较多且有未满足课程的学生进行调整
-    eligible_students = [s for s in students if len(student_courses[s]) > 1]
-    if not eligible_students:
-        print("警告：无法满足所有课程至少 3 人选修的要求。")
-        break
-
-    student_to_adjust = random.choice(eligible_students)
-    course_to_drop = random.choice(student_courses[student_to_adjust])
-    course_to_add = random.choice(unmet_courses)
-
-    if course_to_add not in student_courses[student_to_adjust]:
-        student_courses[student_to_adjust].remove(course_to_drop)
-        student_courses[student_to_adjust].append(course_to_add)
-        course_enrollment[course_to_drop] -= 1
-        course_enrollment[course_to_add] += 1
+# 按课程顺序逐门补足选修人数（确定性，不再随机试探）：
+# 1) 优先让选课最少、尚未选这门课的学生加选；
+# 2) 其余学生都已选满时，从人数最多且有富余（多于 3 人）的课程中换出一名学生改选这门课；
+# 3) 没有富余课程时，必有已选这门课且未选满的学生 Y：让一名已选满的学生 X 把 Y 未选的某门课转给 Y，X 改选这门课。
+# 在上面的可行条件下三种情况必有其一成立，每补一个名额只需 O(log n) 的堆操作。
+course_students = {code: {} for code in course_codes}  # 课程 -> 选修学生（按加入顺序）
+for student, enrolled_courses in student_courses.items():
+    for course_code in enrolled_courses:
+        course_students[course_code][student] = True
+student_order = {student: i for i, student in enumerate(students)}
+course_order = {code: i for i, code in enumerate(course_codes)}
+# 学生按已选门数的最小堆、课程按选修人数的最大堆，数量变化时压入新条目，弹出时丢弃过期条目
+student_heap = [(len(student_courses[student]), student_order[student], student) for student in students]
+heapq.heapify(student_heap)
+course_heap = [(-count, course_order[code], code) for code, count in course_enrollment.items()]
+heapq.heapify(course_heap)
+
+def enroll(student, course_code):
+    student_courses[student].append(course_code)
+    course_students[course_code][student] = True
+    course_enrollment[course_code] += 1
+    heapq.heappush(course_heap, (-course_enrollment[course_code], course_order[course_code], course_code))
+
+def drop(student, course_code):
+    student_courses[student].remove(course_code)
+    del course_students[course_code][student]
+    course_enrollment[course_code] -= 1
+    heapq.heappush(course_heap, (-course_enrollment[course_code], course_order[course_code], course_code))
+
+adjustments = 0
+for course_code in course_codes:
+    while course_enrollment[course_code] < min_students_per_course:
+        adjustments += 1
+        # 1) 选课最少、尚未选这门课的学生
+        candidate = None
+        skipped = []
+        while student_heap:
+            entry = heapq.heappop(student_heap)
+            load, _, student = entry
+            if load != len(student_courses[student]):
+                continue
+            skipped.append(entry)
+            if load >= max_courses_per_student:
+                break
+            if student not in course_students[course_code]:
+                candidate = student
+                skipped.pop()
+                break
+        for entry in skipped:
+            heapq.heappush(student_heap, entry)
+        if candidate is not None:
+            enroll(candidate, course_code)
+            heapq.heappush(student_heap, (len(student_courses[candidate]), student_order[candidate], candidate))
+            continue
+
+        # 2) 人数最多的课程有富余时，换出其中一名未选这门课的学生
+        while -course_heap[0][0] != course_enrollment[course_heap[0][2]]:
+            heapq.heappop(course_heap)
+        surplus_course = course_heap[0][2]
+        if course_enrollment[surplus_course] > min_students_per_course:
+            student = next(s for s in course_students[surplus_course] if s not in course_students[course_code])
+            drop(student, surplus_course)
+            enroll(student, course_code)
+            continue
+
+        # 3) 已选满的学生 X 把一门课转给已选这门课、未选满的学生 Y，X 改选这门课
+        receiver = next(s for s in course_students[course_code] if len(student_courses[s]) < max_courses_per_student)
+        donor = next(s for s in students if s not in course_students[course_code])
+        moved_course = next(c for c in student_courses[donor] if receiver not in course_students[c])
+        drop(donor, moved_course)
+        enroll(donor, course_code)
+        enroll(receiver, moved_course)
+        heapq.heappush(student_heap, (len(student_courses[receiver]), student_order[receiver], receiver))
+
+print(f"已补足选修人数不足的课程，共调整 {adjustments} 次。")
 
 print("\n学生选课情况：")
 for student, courses in student_courses.items():
@@ -142,11 +210,17 @@ for course, count in course_enrollment.items():
     print(f"{course}: {count} 人")
 
 # 5. 记录辅导关系 (假设每位选课学生在每门课都有 1-3 次辅导)
+# 课程 -> 授课教师的倒排索引，只构建一次（教师顺序与 teachers 一致）
+course_teachers = {}
+for teacher, courses_taught in teacher_courses.items():
+    for course_code in courses_taught:
+        course_teachers.setdefault(course_code, []).append(teacher)
+
 tutoring_sessions = []
 for student, enrolled_courses in student_courses.items():
     for course_code in enrolled_courses:
         # 找到教授这门课的老师
-        possible_teachers = [teacher for teacher, courses_taught in teacher_courses.items() if course_code in courses_taught]
+        possible_teachers = course_teachers.get(course_code, [])
         if possible_teachers:
             teacher_for_course = random.choice(possible_teachers)
             num_sessions = random.randint(1, 3)
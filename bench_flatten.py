@@ -0,0 +1,62 @@
+import argparse
+import json
+import time
+import pandas as pd
+from ratings_data import load_ratings_meta, flatten_ratings_compact
+
+def flatten_ratings_rowwise(ratings):
+    """旧版逐行展开实现，仅作为基准对照"""
+    flattened_data = []
+    for rating in ratings:
+        base_data = {
+            'session_id': rating['session_id'],
+            'student_id': rating['student_id'],
+            'teacher_id': rating['teacher_id'],
+            'course_code': rating['course_code'],
+            'schedule': rating['schedule'],
+            'total_score': rating['ratings']['total_score'],
+        }
+        for cat, cat_info in rating['ratings']['ratings'].items():
+            base_data[f'{cat}_score'] = cat_info['score']
+            for cidx, score in cat_info['criteria'].items():
+                base_data[f'{cat}_{cidx}'] = score
+        flattened_data.append(base_data)
+    df = pd.DataFrame(flattened_data)
+    # 旧版随后还需要 json_normalize 拆分 schedule
+    schedule_df = pd.json_normalize(df['schedule'])
+    schedule_df.columns = [f'schedule_{col}' for col in schedule_df.columns]
+    return pd.concat([df.drop(columns=['schedule']), schedule_df], axis=1)
+
+def make_sessions(template, n):
+    """循环复用现有评分记录，构造 n 条会话（只读使用，共享内部字典）"""
+    return [
+        dict(template[i % len(template)], session_id=f"EZ{i+1:07d}")
+        for i in range(n)
+    ]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="对比逐行展开与列式展开评分数据的耗时")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--input', default='course_ratings_compact.json')
+    args = parser.parse_args()
+
+    ratings_meta = load_ratings_meta()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+
+    print(f"{'会话数':>10} {'逐行(s)':>10} {'列式(s)':>10} {'加速比':>8}")
+    for n in args.sizes:
+        sessions = make_sessions(template, n)
+        legacy_df, legacy_time = timed(flatten_ratings_rowwise, sessions)
+        del legacy_df
+        columnar_df, columnar_time = timed(flatten_ratings_compact, sessions, ratings_meta)
+        del columnar_df, sessions
+        print(f"{n:>10} {legacy_time:>10.3f} {columnar_time:>10.3f} {legacy_time / columnar_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
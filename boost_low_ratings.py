@@ -1,9 +1,7 @@
-import json
+import os
+from ratings_data import iter_records, write_records
 
-with open('course_ratings_low.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
-for item in data:
+def boost_item(item):
     ratings = item['ratings']['ratings']
     # 各维度分和细则分提升50%，最高不超过10分
     for cat, cat_info in ratings.items():
@@ -15,8 +13,10 @@ for item in data:
     for cat, cat_info in ratings.items():
         total += cat_info['score'] * cat_info['weight']
     item['ratings']['total_score'] = round(total, 1)
+    return item
 
-with open('course_ratings_low.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, ensure_ascii=False, indent=4)
+# 优先处理 NDJSON（逐行读取，内存占用与文件大小无关）；两种格式都以紧凑格式流式写出，先写临时文件再替换
+path = 'course_ratings_low.ndjson' if os.path.exists('course_ratings_low.ndjson') else 'course_ratings_low.json'
+write_records(map(boost_item, iter_records(path)), path)
 
-print('已将低分组所有分数提升50%，最高不超过10分。') 
\ No newline at end of file
+print('已将低分组所有分数提升50%，最高不超过10分。')
@@ -1,46 +1,1319 @@
 import os
 import shutil
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import json
+import html
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+import argparse
+import base64
 import hashlib
+import gzip
+import re
+from concurrent.futures import ProcessPoolExecutor
+from ratings_data import (load_ratings_meta, load_ratings_history, enrich_ratings_frame, list_segments,
+                          list_compacting_segments, load_segment_frame, concat_ratings_frames)
+from rating_cube import RatingCube, CUBE_DIMENSIONS
+from filter_index import to_day_numbers
 
-def get_avatar_url(name):
+try:
+    import brotli
+except ImportError:
+    # 未安装 brotli 时只生成 .gz，构建时给出警告
+    brotli = None
+
+BOOTSTRAP_CSS_URL = "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css"
+
+# 离线导出时内联的最小样式，只覆盖页面实际用到的 Bootstrap 类
+OFFLINE_CSS = """
+        *, ::before, ::after { box-sizing: border-box; }
+        body { margin: 0; font-family: system-ui, -apple-system, "Segoe UI", "PingFang SC", "Microsoft YaHei", sans-serif;
+               font-size: 1rem; line-height: 1.5; color: #212529; background: #fff; }
+        h1, h5 { margin: 0 0 .5rem; font-weight: 500; line-height: 1.2; }
+        h1 { font-size: 2rem; }
+        h5 { font-size: 1.25rem; }
+        a { color: #0d6efd; }
+        .container-fluid { width: 100%; padding: 0 12px; }
+        .row { display: flex; flex-wrap: wrap; margin: 0 -12px; }
+        .row > * { width: 100%; padding: 0 12px; }
+        @media (min-width: 768px) {
+            .col-md-2 { flex: 0 0 auto; width: 16.6667%; }
+            .col-md-3 { flex: 0 0 auto; width: 25%; }
+            .col-md-6 { flex: 0 0 auto; width: 50%; }
+        }
+        .col-12 { flex: 0 0 auto; width: 100%; }
+        .card { background: #fff; border: 1px solid rgba(0, 0, 0, .125); border-radius: .25rem; }
+        .card-body { padding: 1rem; }
+        .card-title { margin-bottom: .5rem; }
+        .form-label { display: inline-block; margin-bottom: .5rem; }
+        .form-control, .form-select { display: block; width: 100%; padding: .375rem .75rem; font: inherit;
+                                      border: 1px solid #ced4da; border-radius: .25rem; background: #fff; }
+        .form-range { width: 100%; }
+        .d-flex { display: flex; }
+        .flex-wrap { flex-wrap: wrap; }
+        .justify-content-between { justify-content: space-between; }
+        .text-muted { color: #6c757d; }
+        .mt-2 { margin-top: .5rem; }
+        .mt-4 { margin-top: 1.5rem; }
+        .mb-3 { margin-bottom: 1rem; }
+        .mb-4 { margin-bottom: 1.5rem; }
+"""
+
+def page_head(offline, assets, prefix=''):
+    """页面引用的样式与 Plotly 脚本
+
+    在线导出使用 CDN 上与 plotly 包一致的固定版本；离线导出内联最小样式，
+    并引用导出目录中的 plotly.min.js。prefix 为页面到导出根目录的相对路径。
+    """
+    if offline:
+        return f"""<style>{OFFLINE_CSS}    </style>
+    <script src="{prefix}{assets['vendor/plotly.min.js']}"></script>"""
+    return f"""<link href="{BOOTSTRAP_CSS_URL}" rel="stylesheet">
+    <script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>"""
+
+def render_avatar_svg(name):
+    """本地生成的教师头像：按姓名哈希取底色，显示姓名首字"""
     seed = hashlib.md5(name.encode('utf-8')).hexdigest()
-    return f"https://api.dicebear.com/7.x/micah/svg?seed={seed}"
+    hue = int(seed[:4], 16) % 360
+    initial = html.escape(name[:1])
+    return f"""<svg xmlns="http://www.w3.org/2000/svg" width="40" height="40" viewBox="0 0 40 40">
+<circle cx="20" cy="20" r="20" fill="hsl({hue}, 55%, 55%)"/>
+<text x="20" y="26" font-size="18" text-anchor="middle" fill="#fff" font-family="sans-serif">{initial}</text>
+</svg>
+"""
+
+# 预聚合分片名称，默认视图只需下载这些文件
+AGGREGATE_SHARDS = ['summary', 'histogram', 'teachers', 'courses', 'dimensions', 'daily']
+
+def _round(values, digits=3):
+    return [None if pd.isna(v) else round(float(v), digits) for v in values]
+
+def score_quantiles(scores, qs):
+    """由各课程每个总分取值的会话数计算分位数，与在原始会话上 quantile()（线性插值）一致
+
+    scores 按 course_code、total_score 排序，返回以 course_code 为索引、每个分位数一列的表。
+    """
+    rows = {}
+    for course, group in scores.groupby('course_code', sort=False):
+        values = group['total_score'].to_numpy(dtype=np.float64)
+        ends = group['count'].to_numpy().cumsum()
+        positions = np.asarray(qs) * (ends[-1] - 1)
+        lower = np.floor(positions)
+        below = values[np.searchsorted(ends, lower, side='right')]
+        above = values[np.searchsorted(ends, np.minimum(lower + 1, ends[-1] - 1), side='right')]
+        rows[course] = below + (above - below) * (positions - lower)
+    return pd.DataFrame.from_dict(rows, orient='index', columns=qs).rename_axis('course_code')
+
+def build_aggregates(cube, scores, ratings_meta):
+    """由评分立方体与课程总分计数生成默认视图的预聚合分片：总览、总分分布、教师、课程、评分维度、每日趋势
+
+    scores 为各课程每个总分取值的会话数（course_code、total_score、count），箱线图的分位数与
+    总分分布都由它得到，无需回到原始会话。
+    """
+    categories = list(ratings_meta)
+    valid = scores[scores['total_score'].notna()]
+
+    summary = {
+        'count': int(cube.cells['count'].sum()),
+        'mean': round(float(cube.means(['total_score'])['total_score']), 3),
+        'max': round(float(valid['total_score'].max()), 1),
+        'min': round(float(valid['total_score'].min()), 1)
+    }
+
+    # 总分按 0.1 分一档计数
+    histogram = valid.groupby(valid['total_score'].astype(float).round(1))['count'].sum().sort_index()
+
+    teachers = (
+        cube.rollup(['teacher_id', 'Teacher Name'], first=['Business Category'])
+        .sort_values('total_score', ascending=False, kind='stable')
+    )
+
+    course_scores = valid[valid['course_code'].notna()]
+    courses = cube.rollup('course_code', ['total_score'])
+    courses = courses.join(score_quantiles(course_scores, [0.25, 0.5, 0.75]), on='course_code')
+    courses = courses.join(course_scores.groupby('course_code')['total_score'].min().rename('min'), on='course_code')
+    courses = courses.join(course_scores.groupby('course_code')['total_score'].max().rename('max'), on='course_code')
+
+    daily = cube.rollup('schedule_start_date', ['total_score'])
+    dimension_means = cube.means([f'{cat}_score' for cat in categories])
+
+    return {
+        'summary': summary,
+        'histogram': {
+            'scores': _round(histogram.index, 1),
+            'counts': histogram.astype(int).tolist()
+        },
+        'teachers': [
+            {
+                'id': row['teacher_id'],
+                'name': row['Teacher Name'],
+                'category': None if pd.isna(row['Business Category']) else row['Business Category'],
+                'count': int(row['count']),
+                'mean': round(float(row['total_score']), 3),
+                'dimensions': _round([row[f'{cat}_score'] for cat in categories])
+            }
+            for _, row in teachers.iterrows()
+        ],
+        'courses': [
+            {
+                'code': row['course_code'],
+                'count': int(row['count']),
+                'mean': round(float(row['total_score']), 3),
+                'q1': round(float(row[0.25]), 3),
+                'median': round(float(row[0.5]), 3),
+                'q3': round(float(row[0.75]), 3),
+                'min': round(float(row['min']), 1),
+                'max': round(float(row['max']), 1)
+            }
+            for _, row in courses.iterrows()
+        ],
+        'dimensions': {
+            'categories': categories,
+            'means': _round(dimension_means.values)
+        },
+        'daily': {
+            'dates': daily['schedule_start_date'].tolist(),
+            'means': _round(daily['total_score']),
+            'counts': daily['count'].astype(int).tolist()
+        }
+    }
+
+def report_key(value):
+    """教师 ID、课程代码对应的报告页与数据切片文件名（与页面脚本中的 reportPage 保持一致）"""
+    return re.sub(r'[\\/:*?"<>|\s]', '_', str(value))
+
+def _trend(rows):
+    return {
+        'dates': rows['schedule_start_date'].tolist(),
+        'means': _round(rows['total_score']),
+        'counts': rows['count'].astype(int).tolist()
+    }
+
+# 报告页类型：页面目录 -> 切片类型、分组 ID 列，以及分项表的标签列与链接目标
+REPORT_KINDS = {
+    'teachers': {'kind': 'teacher', 'id': 'teacher_id', 'label': 'course_code', 'link': 'courses', 'link_id': 'course_code'},
+    'courses': {'kind': 'course', 'id': 'course_code', 'label': 'Teacher Name', 'link': 'teachers', 'link_id': 'teacher_id'},
+}
+
+def build_report_tables(cube):
+    """由评分立方体一次上卷出全部报告页所需的分组统计
+
+    返回 {页面目录: (每个实体一行的总览表, 每日趋势表, 分项表)}，后两张表按实体 ID 分组后
+    即为单个报告页的数据，逐页组装切片在进程池中完成。
+    """
+    return {
+        'teachers': (
+            cube.rollup(['teacher_id', 'Teacher Name'], first=['Business Category']),
+            cube.rollup(['teacher_id', 'schedule_start_date'], ['total_score']),
+            cube.rollup(['teacher_id', 'course_code'], ['total_score'])
+        ),
+        'courses': (
+            cube.rollup('course_code'),
+            cube.rollup(['course_code', 'schedule_start_date'], ['total_score']),
+            cube.rollup(['course_code', 'teacher_id', 'Teacher Name'], ['total_score'])
+        ),
+    }
+
+def build_report_slice(kind, row, trend, breakdown, categories, course_titles):
+    """单个教师或课程报告页的数据切片：总览、评分维度雷达、每日趋势，以及按课程（教师页）或按教师（课程页）的分项统计"""
+    spec = REPORT_KINDS[kind]
+    if kind == 'teachers':
+        title = f"教师报告：{row['Teacher Name']}"
+        subtitle = None if pd.isna(row['Business Category']) else row['Business Category']
+    else:
+        title = f"课程报告：{row['course_code']}"
+        subtitle = course_titles.get(row['course_code'])
+    return {
+        'kind': spec['kind'],
+        'title': title,
+        'subtitle': subtitle,
+        'count': int(row['count']),
+        'mean': round(float(row['total_score']), 3),
+        'dimensions': {'categories': categories, 'means': _round([row[f'{cat}_score'] for cat in categories])},
+        'trend': _trend(trend),
+        'breakdown': {
+            'labels': breakdown[spec['label']].tolist(),
+            'means': _round(breakdown['total_score']),
+            'counts': breakdown['count'].astype(int).tolist(),
+            'links': [f"../{spec['link']}/{report_key(key)}.html" for key in breakdown[spec['link_id']]]
+        }
+    }
+
+# 字典编码列：列名 -> (会话列, 字典名)
+CODED_COLUMNS = {
+    'category': ('Business Category', 'category'),
+    'course': ('course_code', 'course'),
+    'teacher': ('teacher_id', 'teacher_id'),
+    'student': ('Student Name', 'student'),
+}
+
+# 字典编码列的类型：取值不超过 Uint16 范围时用 Uint16，否则用 Uint32；类型最大值表示缺失
+CODE_TYPES = [np.dtype('<u2'), np.dtype('<u4')]
+
+def extend_dictionary(values, dictionary):
+    """字典只追加不重排：已有取值的编码在多次构建间保持不变，新取值排序后追加到末尾"""
+    added = sorted(set(pd.Series(values, dtype=object).dropna()) - set(dictionary))
+    return list(dictionary) + added
+
+def code_type(dictionary):
+    return next(t for t in CODE_TYPES if len(dictionary) < np.iinfo(t).max)
+
+def column_types(ratings_meta, dictionaries):
+    """各列文件的数据类型，字典编码列按当前字典大小确定"""
+    types = {'day': '<u2'}
+    types.update({name: code_type(dictionaries[key]).str for name, (_, key) in CODED_COLUMNS.items()})
+    types['total'] = '<f4'
+    types.update({f'score_{i}': '<f4' for i in range(len(ratings_meta))})
+    types['row'] = '<u4'
+    return types
+
+# 列文件的数据类型 -> 浏览器中的 TypedArray 名称
+TYPED_ARRAY_NAMES = {'<f4': 'Float32', '<u2': 'Uint16', '<u4': 'Uint32'}
+
+def data_script(name, payload):
+    """离线导出的数据脚本：以 <script> 加载时将数据登记到 EXPORT_DATA[name]
+
+    从本地文件打开页面时浏览器禁止 fetch，数据改由脚本标签加载。
+    """
+    return f"EXPORT_DATA[{json.dumps(name)}]={json.dumps(payload, ensure_ascii=False, separators=(',', ':'))};\n".encode('utf-8')
+
+def inline_json(payload):
+    """内联到 <script> 中的 JSON，转义 </ 以免提前结束脚本标签"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def encode_partition(frame, ratings_meta, dictionaries, types):
+    """将一个月份分区的会话编码为逐列数组（小端序），浏览器可直接读为 TypedArray
+
+    评分为 Float32，业务分类、课程、教师、学生按字典编码（缺失值为类型最大值），
+    日期为 Uint16 天数（自 1970-01-01 起）。字典需已包含分区中的全部取值。
+    row 为会话在完整历史中的序号（Uint32），Worker 据此取每位教师首次出现的会话，与预聚合分片一致。
+    """
+    days = to_day_numbers(frame['schedule_start_date'])
+    if len(days) and days.max() >= np.iinfo(np.uint16).max:
+        raise ValueError("日期超出 Uint16 天数范围")
+
+    arrays = {'day': days.astype('<u2')}
+    for name, (column, key) in CODED_COLUMNS.items():
+        dtype = np.dtype(types[name])
+        codes = pd.Index(dictionaries[key], dtype=object).get_indexer(frame[column].astype(object))
+        arrays[name] = np.where(codes < 0, np.iinfo(dtype).max, codes).astype(dtype)
+    arrays['total'] = frame['total_score'].to_numpy(dtype='<f4')
+    for i, cat in enumerate(ratings_meta):
+        arrays[f'score_{i}'] = frame[f'{cat}_score'].to_numpy(dtype='<f4')
+    if len(frame) and frame['_row'].max() >= np.iinfo(np.uint32).max:
+        raise ValueError("会话序号超出 Uint32 范围")
+    arrays['row'] = frame['_row'].to_numpy(dtype='<u4')
+    return arrays
+
+def partition_assets(entry):
+    """分区记录引用的资源逻辑路径"""
+    if 'script' in entry:
+        return [f"data/{entry['script']}.js"]
+    return [f'data/{path}' for path in entry['files'].values()]
+
+def write_columns(frames, ratings_meta, writer, dictionaries, previous, load_frame, offline=False):
+    """写出按月分区的逐列二进制文件，只编码有变化的月份
+
+    offline 为 True 时每个分区写为一个数据脚本，各列以 base64 保存，页面解码后同样读为 TypedArray。
+
+    frames 为有变化月份的分区会话；previous 为其余月份上次构建的分区记录（行数、列类型与文件）。
+    字典增长导致编码类型变化、或上次的文件已不存在时，由 load_frame(月份) 从构建缓存读取会话重新编码。
+    dictionaries 原地更新，返回 {月份: 分区记录}。
+    """
+    for name, (column, key) in CODED_COLUMNS.items():
+        values = pd.concat([frame[column] for _, frame in sorted(frames.items())]) if frames else []
+        dictionaries[key] = extend_dictionary(values, dictionaries.get(key, []))
+    types = column_types(ratings_meta, dictionaries)
+
+    partitions = {}
+    for month in sorted(set(frames) | set(previous)):
+        record = previous.get(month)
+        if month not in frames and record['types'] == types and all(
+                writer.keep(name) for name in partition_assets(record['entry'])):
+            partitions[month] = record
+            continue
+        frame = frames[month] if month in frames else load_frame(month)
+        arrays = encode_partition(frame, ratings_meta, dictionaries, types)
+        if offline:
+            script = f'columns/{month}'
+            encoded = {name: base64.b64encode(values.tobytes()).decode('ascii') for name, values in arrays.items()}
+            writer.write(f'data/{script}.js', data_script(script, encoded))
+            entry = {'key': month, 'rows': int(len(frame)), 'script': script}
+        else:
+            files = {}
+            for name, values in arrays.items():
+                files[name] = f'columns/{month}/{name}.bin'
+                writer.write(f'data/{files[name]}', values.tobytes())
+            entry = {'key': month, 'rows': int(len(frame)), 'files': files}
+        partitions[month] = {'types': types, 'entry': entry}
+    return partitions
+
+def columns_manifest(partitions, ratings_meta, dictionaries, teacher_names):
+    """描述各分区文件、字典与行数的清单，写为 columns.json"""
+    types = column_types(ratings_meta, dictionaries)
+    entries = [partitions[month]['entry'] for month in sorted(partitions)]
+    return {
+        'rows': sum(entry['rows'] for entry in entries),
+        'missing': {name: int(np.iinfo(np.dtype(types[name])).max) for name in CODED_COLUMNS},
+        'categories': list(ratings_meta),
+        'dictionaries': {
+            'category': dictionaries['category'],
+            'course': dictionaries['course'],
+            'teacher_id': dictionaries['teacher_id'],
+            'teacher_name': [
+                str(teacher_names[t]) if t in teacher_names.index else t for t in dictionaries['teacher_id']
+            ],
+            'student': dictionaries['student']
+        },
+        'types': {name: TYPED_ARRAY_NAMES[dtype] for name, dtype in types.items()},
+        'partitions': entries
+    }
+
+# 内容哈希取 sha256 的前若干位
+ASSET_HASH_LENGTH = 10
+
+def compress_file(path):
+    """在原文件旁写出预压缩的 .gz（及 .br）副本，静态服务器可直接按 Accept-Encoding 返回"""
+    data = path.read_bytes()
+    # mtime 固定为 0，内容不变时压缩结果也不变
+    with open(f'{path}.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f'{path}.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+def compressed_exists(path):
+    """文件及其预压缩副本均已存在（安装 brotli 时包括 .br）"""
+    suffixes = ['', '.gz'] + (['.br'] if brotli is not None else [])
+    return all(Path(f'{path}{suffix}').exists() for suffix in suffixes)
+
+class AssetWriter:
+    """内容寻址的资源写出器
+
+    资源以 名称.哈希.扩展名 写入导出目录，内容变化即文件名变化，可配置长期缓存。
+    同名同内容的文件上次构建已生成时直接复用，不再写出和压缩。
+    assets 记录 逻辑路径 -> 带哈希路径 的映射（均相对于导出目录），供页面解析实际文件名。
+    previous 为上次构建的映射，内容未变化的资源可由 keep 直接沿用，无需重新生成。
+    """
+
+    def __init__(self, output_dir, previous=None):
+        self.output_dir = output_dir
+        self.previous = previous or {}
+        self.assets = {}
+        self.written = 0
+        self.reused = 0
+
+    def write(self, name, data):
+        """写出资源，返回带哈希的相对路径"""
+        digest = hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]
+        logical = PurePosixPath(name)
+        hashed = logical.with_name(f'{logical.stem}.{digest}{logical.suffix}').as_posix()
+        path = self.output_dir / hashed
+        if compressed_exists(path):
+            self.reused += 1
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            compress_file(path)
+            self.written += 1
+        self.assets[name] = hashed
+        return hashed
+
+    def keep(self, name):
+        """沿用上次构建写出的资源，文件已不存在时返回 False"""
+        hashed = self.previous.get(name)
+        if hashed is None or not compressed_exists(self.output_dir / hashed):
+            return False
+        self.assets[name] = hashed
+        self.reused += 1
+        return True
+
+    def write_json(self, name, payload):
+        return self.write(name, json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def remove_stale(self, previous_assets):
+        """删除上次构建生成、本次不再引用的资源及其压缩副本"""
+        current = set(self.assets.values())
+        for hashed in set(previous_assets.values()) - current:
+            path = self.output_dir / hashed
+            for stale in [path, Path(f'{path}.gz'), Path(f'{path}.br')]:
+                stale.unlink(missing_ok=True)
+            # 目录已空时一并删除
+            if path.parent != self.output_dir and not any(path.parent.iterdir()):
+                path.parent.rmdir()
+
+# 构建清单：记录输入文件哈希、字典编码、月份分区与已生成的资源，用于增量重建
+BUILD_MANIFEST = 'build_manifest.json'
+
+# 影响导出结果的代码文件，变化时同样需要重建
+BUILD_SOURCES = ['build_static.py', 'ratings_data.py', 'rating_cube.py', 'filter_index.py']
+
+def file_digest(path, chunksize=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def input_digests(data_dir, input_files, log_dir):
+    """所有构建输入（数据文件、追加日志分段、构建代码）的内容哈希，以相对路径为键"""
+    code_dir = Path(__file__).parent
+    paths = {name: data_dir / name for name in input_files if (data_dir / name).exists()}
+    segments = list_compacting_segments(log_dir) + list_segments(log_dir)
+    paths.update({Path(path).relative_to(data_dir).as_posix(): Path(path) for path in segments})
+    paths.update({name: code_dir / name for name in BUILD_SOURCES})
+    return {name: file_digest(path) for name, path in paths.items()}
+
+def load_manifest(cache_dir):
+    """读取上次构建的清单，不存在或已损坏时返回 None"""
+    try:
+        with open(cache_dir / BUILD_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(cache_dir, manifest):
+    tmp_path = cache_dir / f'{BUILD_MANIFEST}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, cache_dir / BUILD_MANIFEST)
+
+# 构建缓存目录（默认位于数据目录下，不在导出目录内，避免随静态页面发布）：保存构建清单，
+# 并在 partitions/ 中按月保存分区会话与其可加统计，文件名带分区内容哈希，构建清单记录每个月份当前对应的哈希
+BUILD_CACHE = '.static_build_cache'
+
+def partition_columns(ratings_meta):
+    """分区保存的会话列：立方体维度、学生与各项评分"""
+    return CUBE_DIMENSIONS + ['student_id', 'Student Name', 'total_score'] + [f'{cat}_score' for cat in ratings_meta]
+
+def split_months(df, ratings_meta, start=0):
+    """将会话宽表按月拆分为分区，月内保持原有顺序
+
+    评分统一为 Float32、其余列为 object，同一批会话不论读自列式存储还是追加分段，分区内容哈希都相同。
+    _row 为会话在完整历史中的序号（本批会话从 start 开始），用于按首次出现的顺序排列立方体单元。
+    """
+    scores = ['total_score'] + [f'{cat}_score' for cat in ratings_meta]
+    frame = pd.DataFrame({
+        column: df[column].to_numpy(dtype=np.float32 if column in scores else object)
+        for column in partition_columns(ratings_meta)
+    })
+    frame['_row'] = np.arange(start, start + len(frame), dtype=np.int64)
+    months = frame['schedule_start_date'].str[:7].to_numpy()
+    return {month: rows.reset_index(drop=True) for month, rows in frame.groupby(months, sort=True)}
+
+def partition_digest(frame):
+    return hashlib.sha256(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()
+
+def build_partition(frame, measures):
+    """单个月份分区的可加统计：立方体单元、各课程每个总分取值的会话数（用于分位数与总分分布）以及学生姓名
+
+    各月份的统计按日期互不重叠，拼接后按 first_row 排序即与在完整历史上构建的立方体一致。
+    """
+    cells = RatingCube.from_frame(frame, measures, students=False).cells
+    cells['first_row'] = frame.groupby(CUBE_DIMENSIONS, dropna=False, sort=False)['_row'].min().to_numpy()
+    return {
+        'cells': cells,
+        'scores': frame.groupby(['course_code', 'total_score'], dropna=False).size().rename('count').reset_index(),
+        'students': frame['Student Name'].dropna().unique()
+    }
+
+class PartitionCache:
+    """按月分区的构建缓存，每个分区保存会话（rows）与可加统计（stats）两个文件
+
+    文件以 月份.内容哈希 命名，写入新分区不会覆盖清单仍引用的旧文件，构建中途失败时缓存保持一致。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def path(self, month, digest, part):
+        return self.cache_dir / f'{month}.{digest}.{part}.pkl'
+
+    def exists(self, month, digest):
+        return all(self.path(month, digest, part).exists() for part in ['rows', 'stats'])
+
+    def load(self, month, digest, part):
+        return pd.read_pickle(self.path(month, digest, part))
+
+    def save(self, month, digest, frame, stats):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for part, payload in [('rows', frame), ('stats', stats)]:
+            tmp_path = Path(f'{self.path(month, digest, part)}.tmp')
+            pd.to_pickle(payload, tmp_path)
+            os.replace(tmp_path, self.path(month, digest, part))
+
+    def prune(self, digests):
+        """删除不再被引用的分区文件，digests 为 {月份: 内容哈希}"""
+        if not self.cache_dir.exists():
+            return
+        current = {self.path(month, digest, part).name for month, digest in digests.items() for part in ['rows', 'stats']}
+        for path in self.cache_dir.iterdir():
+            if path.name not in current:
+                path.unlink()
+
+def delta_segments(inputs, previous_inputs, log_prefix):
+    """上次构建之后只新增了追加日志分段、其余输入均未变化时返回新增分段的相对路径，否则返回 None"""
+    if any(inputs.get(name) != digest for name, digest in previous_inputs.items()):
+        return None
+    added = [name for name in inputs if name not in previous_inputs]
+    if not all(name.startswith(log_prefix) for name in added):
+        return None
+    return added
+
+# 筛选聚合 Web Worker 脚本：原始会话列以可转移的 TypedArray 交给 Worker，
+# 筛选与聚合都在 Worker 中完成，主线程只负责绘图
+WORKER_JS = r"""
+let rows = null;
+
+function toDay(date) {
+    return Math.floor(Date.parse(date) / 86400000);
+}
+
+function fromDay(day) {
+    return new Date(day * 86400000).toISOString().slice(0, 10);
+}
+
+// 返回满足筛选条件的会话下标（Uint32Array）
+function applyFilters(rows, filters) {
+    const c = rows.columns;
+    const d = rows.dictionaries;
+    const startDay = filters.startDate ? toDay(filters.startDate) : -Infinity;
+    const endDay = filters.endDate ? toDay(filters.endDate) : Infinity;
+    const category = filters.category ? d.category.indexOf(filters.category) : null;
+    const course = filters.course ? d.course.indexOf(filters.course) : null;
+    const student = filters.student ? d.student.indexOf(filters.student) : null;
+    // 评分以 Float32 存储，阈值同样取 Float32 精度再比较
+    const minScore = Math.fround(filters.minScore);
+    const indices = new Uint32Array(c.total.length);
+    let n = 0;
+    for (let i = 0; i < c.total.length; i++) {
+        // 日期筛选
+        if (c.day[i] < startDay || c.day[i] > endDay) continue;
+        // 业务分类筛选
+        if (category !== null && c.category[i] !== category) continue;
+        // 课程筛选
+        if (course !== null && c.course[i] !== course) continue;
+        // 教师筛选
+        if (filters.teacher && d.teacher_name[c.teacher[i]] !== filters.teacher) continue;
+        // 学生筛选
+        if (student !== null && c.student[i] !== student) continue;
+        // 分数筛选
+        if (c.total[i] < minScore) continue;
+        indices[n++] = i;
+    }
+    return indices.subarray(0, n);
+}
+
+function quantile(sorted, q) {
+    const pos = (sorted.length - 1) * q;
+    const lower = Math.floor(pos);
+    const upper = Math.ceil(pos);
+    return sorted[lower] + (sorted[upper] - sorted[lower]) * (pos - lower);
+}
+
+// 在浏览器中聚合筛选后的会话，结构与预聚合分片一致
+function aggregate(rows, indices) {
+    const c = rows.columns;
+    const d = rows.dictionaries;
+    const nCategories = rows.categories.length;
+    let total = 0;
+    let max = -Infinity;
+    let min = Infinity;
+    const histogram = new Map();
+    const teachers = new Map();
+    const courses = new Map();
+    const daily = new Map();
+    const dimensionSums = new Array(nCategories).fill(0);
+
+    for (const i of indices) {
+        const score = c.total[i];
+        total += score;
+        if (score > max) max = score;
+        if (score < min) min = score;
+        const bucket = Math.round(score * 10) / 10;
+        histogram.set(bucket, (histogram.get(bucket) || 0) + 1);
+
+        // 教师的业务分类取其在完整历史中最早的会话（分区按月排列，需按会话序号比较）
+        const category = c.category[i] !== rows.missing ? d.category[c.category[i]] : null;
+        let teacher = teachers.get(c.teacher[i]);
+        if (!teacher) {
+            teacher = {
+                id: d.teacher_id[c.teacher[i]],
+                name: d.teacher_name[c.teacher[i]],
+                category,
+                first: c.row[i],
+                count: 0,
+                total: 0,
+                dimensions: new Array(nCategories).fill(0)
+            };
+            teachers.set(c.teacher[i], teacher);
+        } else if (c.row[i] < teacher.first) {
+            teacher.first = c.row[i];
+            teacher.category = category;
+        }
+        teacher.count += 1;
+        teacher.total += score;
+        for (let k = 0; k < nCategories; k++) {
+            const value = c.scores[k][i];
+            teacher.dimensions[k] += value;
+            dimensionSums[k] += value;
+        }
+
+        const courseScores = courses.get(c.course[i]) || [];
+        courseScores.push(score);
+        courses.set(c.course[i], courseScores);
+
+        const day = daily.get(c.day[i]) || {total: 0, count: 0};
+        day.total += score;
+        day.count += 1;
+        daily.set(c.day[i], day);
+    }
+
+    const count = indices.length;
+    const scores = [...histogram.keys()].sort((a, b) => a - b);
+    const days = [...daily.keys()].sort((a, b) => a - b);
+    return {
+        summary: {count, mean: count ? total / count : null, max: count ? max : null, min: count ? min : null},
+        histogram: {scores, counts: scores.map(s => histogram.get(s))},
+        teachers: [...teachers.values()]
+            .map(t => ({
+                id: t.id,
+                name: t.name,
+                category: t.category,
+                count: t.count,
+                mean: t.total / t.count,
+                dimensions: t.dimensions.map(v => v / t.count)
+            }))
+            .sort((a, b) => b.mean - a.mean),
+        courses: [...courses.entries()]
+            .sort((a, b) => d.course[a[0]].localeCompare(d.course[b[0]]))
+            .map(([code, values]) => {
+                const sorted = values.sort((a, b) => a - b);
+                return {
+                    code: d.course[code],
+                    count: sorted.length,
+                    mean: sorted.reduce((a, b) => a + b, 0) / sorted.length,
+                    q1: quantile(sorted, 0.25),
+                    median: quantile(sorted, 0.5),
+                    q3: quantile(sorted, 0.75),
+                    min: sorted[0],
+                    max: sorted[sorted.length - 1]
+                };
+            }),
+        dimensions: {
+            categories: rows.categories,
+            means: dimensionSums.map(v => count ? v / count : null)
+        },
+        daily: {
+            dates: days.map(fromDay),
+            means: days.map(day => daily.get(day).total / daily.get(day).count),
+            counts: days.map(day => daily.get(day).count)
+        }
+    };
+}
+
+self.onmessage = function(e) {
+    const message = e.data;
+    if (message.type === 'load') {
+        rows = message.rows;
+    } else if (message.type === 'aggregate') {
+        const view = aggregate(rows, applyFilters(rows, message.filters));
+        self.postMessage({id: message.id, view});
+    }
+};
+"""
+
+# 看板前端脚本（普通字符串，插入 HTML 时不经过 f-string 转义）
+DASHBOARD_JS = r"""
+        const DATA_DIR = 'data/';
+        const AGGREGATE_SHARDS = ['summary', 'histogram', 'teachers', 'courses', 'dimensions', 'daily'];
+
+        // 筛选滑块防抖间隔（毫秒）
+        const FILTER_DEBOUNCE_MS = 150;
+
+        // 已请求的数据文件：每个文件只下载、解析一次，之后筛选直接复用内存中的结果
+        const dataCache = new Map();
+
+        // 离线导出可直接从本地文件打开，此时浏览器禁止 fetch：
+        // 默认视图数据内联在 INLINE_DATA 中，其余数据以 <script> 加载并登记到 EXPORT_DATA
+        window.EXPORT_DATA = {};
+
+        function loadDataScript(name) {
+            return new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = ASSETS[DATA_DIR + name + '.js'];
+                script.onload = () => {
+                    const payload = EXPORT_DATA[name];
+                    delete EXPORT_DATA[name];
+                    script.remove();
+                    resolve(payload);
+                };
+                script.onerror = reject;
+                document.head.appendChild(script);
+            });
+        }
+
+        function decodeBase64(text) {
+            const binary = atob(text);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return bytes.buffer;
+        }
+
+        function fetchJSON(name) {
+            if (!dataCache.has(name)) {
+                if (name in INLINE_DATA) {
+                    dataCache.set(name, Promise.resolve(INLINE_DATA[name]));
+                } else if (OFFLINE) {
+                    dataCache.set(name, loadDataScript(name));
+                } else {
+                    // 数据文件名带内容哈希，由 ASSETS 解析实际路径
+                    dataCache.set(name, fetch(ASSETS[DATA_DIR + name]).then(r => r.json()));
+                }
+            }
+            return dataCache.get(name);
+        }
+
+        function fetchBuffer(name) {
+            // 列文件拼接后即转移给 Worker，不在页面中缓存
+            return fetch(ASSETS[DATA_DIR + name]).then(r => r.arrayBuffer());
+        }
+
+        const TYPED_ARRAYS = {Float32: Float32Array, Uint16: Uint16Array, Uint32: Uint32Array};
+
+        // 筛选聚合在 Worker 中进行，页面只加载一次原始会话
+        let workerReady = null;
+        let nextRequestId = 0;
+        const pendingRequests = new Map();
+
+        // 加载原始会话：读取列清单后并行下载各月分区的列文件，按列拼接为 TypedArray
+        async function loadRows() {
+            const manifest = await fetchJSON('columns.json');
+            const names = Object.keys(manifest.types);
+            const buffers = await Promise.all(manifest.partitions.map(partition => partition.script
+                ? loadDataScript(partition.script).then(encoded => names.map(name => decodeBase64(encoded[name])))
+                : Promise.all(names.map(name => fetchBuffer(partition.files[name])))
+            ));
+            const arrays = {};
+            names.forEach((name, j) => {
+                const ArrayType = TYPED_ARRAYS[manifest.types[name]];
+                const array = new ArrayType(manifest.rows);
+                let offset = 0;
+                buffers.forEach(partitionBuffers => {
+                    const part = new ArrayType(partitionBuffers[j]);
+                    array.set(part, offset);
+                    offset += part.length;
+                });
+                arrays[name] = array;
+            });
+            return {
+                missing: manifest.missing.category,
+                categories: manifest.categories,
+                dictionaries: manifest.dictionaries,
+                columns: {
+                    day: arrays.day,
+                    category: arrays.category,
+                    course: arrays.course,
+                    teacher: arrays.teacher,
+                    student: arrays.student,
+                    total: arrays.total,
+                    scores: manifest.categories.map((_, k) => arrays[`score_${k}`]),
+                    row: arrays.row
+                }
+            };
+        }
+
+        function startWorker() {
+            if (!workerReady) {
+                workerReady = loadRows().then(rows => {
+                    // 离线导出的 Worker 脚本内联在页面中，以 Blob URL 启动
+                    const worker = OFFLINE
+                        ? new Worker(URL.createObjectURL(new Blob([WORKER_SOURCE], {type: 'text/javascript'})))
+                        : new Worker(ASSETS['filter_worker.js']);
+                    worker.onmessage = function(e) {
+                        pendingRequests.get(e.data.id)(e.data.view);
+                        pendingRequests.delete(e.data.id);
+                    };
+                    // 转移后主线程中的缓冲区即被分离，数据只保留在 Worker 中
+                    const transfer = [
+                        rows.columns.day, rows.columns.category, rows.columns.course,
+                        rows.columns.teacher, rows.columns.student, rows.columns.total,
+                        ...rows.columns.scores, rows.columns.row
+                    ].map(array => array.buffer);
+                    worker.postMessage({type: 'load', rows}, transfer);
+                    return worker;
+                });
+            }
+            return workerReady;
+        }
+
+        // 在 Worker 中筛选并聚合，返回与预聚合分片结构一致的视图
+        async function aggregateInWorker(filters) {
+            const worker = await startWorker();
+            const id = nextRequestId++;
+            return new Promise(resolve => {
+                pendingRequests.set(id, resolve);
+                worker.postMessage({type: 'aggregate', id, filters});
+            });
+        }
+
+        function loadAggregates() {
+            return Promise.all(AGGREGATE_SHARDS.map(name => fetchJSON(`agg/${name}.json`)))
+                .then(shards => Object.fromEntries(AGGREGATE_SHARDS.map((name, i) => [name, shards[i]])));
+        }
+
+        // 每次筛选递增，丢弃过期筛选的结果，避免先发后至覆盖最新视图
+        let renderToken = 0;
+
+        // 加载数据
+        async function loadData() {
+            const token = ++renderToken;
+            const filters = getFilters();
+            let view;
+            if (isDefaultView(filters)) {
+                // 默认视图直接使用预聚合分片，不下载原始会话
+                view = await loadAggregates();
+            } else {
+                // 下钻时才加载原始会话，在 Worker 中筛选并聚合
+                view = await aggregateInWorker(filters);
+            }
+            if (token === renderToken) {
+                render(view);
+            }
+        }
+
+        function debounce(func, wait) {
+            let timer = null;
+            return function(...args) {
+                clearTimeout(timer);
+                timer = setTimeout(() => func.apply(this, args), wait);
+            };
+        }
+
+        function getFilters() {
+            return {
+                startDate: document.getElementById('start-date').value,
+                endDate: document.getElementById('end-date').value,
+                category: document.getElementById('category-filter').value,
+                course: document.getElementById('course-filter').value,
+                teacher: document.getElementById('teacher-filter').value,
+                student: document.getElementById('student-filter').value,
+                minScore: parseFloat(document.getElementById('score-range').value)
+            };
+        }
+
+        function isDefaultView(filters) {
+            return filters.startDate <= DEFAULTS.startDate && filters.endDate >= DEFAULTS.endDate &&
+                !filters.category && !filters.course && !filters.teacher && !filters.student &&
+                filters.minScore <= DEFAULTS.minScore;
+        }
+
+        function render(view) {
+            // 更新统计信息
+            updateStats(view.summary);
+
+            // 更新教师卡片
+            updateTeacherCards(view.teachers.slice(0, 5));
+
+            // 绘制图表
+            drawCharts(view);
+        }
+
+        function formatScore(value) {
+            return value === null ? '-' : value.toFixed(1);
+        }
+
+        function updateStats(summary) {
+            document.getElementById('total-courses').textContent = summary.count;
+            document.getElementById('avg-score').textContent = formatScore(summary.mean);
+            document.getElementById('max-score').textContent = formatScore(summary.max);
+            document.getElementById('min-score').textContent = formatScore(summary.min);
+        }
+
+        function avatarUrl(teacher) {
+            // 离线导出使用构建时生成的本地头像
+            if (OFFLINE) {
+                return ASSETS[`avatars/${reportKey(teacher.id)}.svg`];
+            }
+            return `https://api.dicebear.com/7.x/micah/svg?seed=${encodeURIComponent(teacher.name)}`;
+        }
+
+        function updateTeacherCards(teacherList) {
+            const cardsContainer = document.getElementById('teacher-cards');
+            cardsContainer.innerHTML = teacherList.map(teacher => `
+                <div class="teacher-card" onclick="showTeacherDetails('${teacher.id}')">
+                    <img src="${avatarUrl(teacher)}" 
+                         class="teacher-avatar" alt="${teacher.name}">
+                    <div class="teacher-name">${teacher.name}</div>
+                    <div class="teacher-category">${teacher.category || ''}</div>
+                </div>
+            `).join('');
+        }
+
+        function drawCharts(view) {
+            // 绘制评分分布图
+            Plotly.newPlot('rating-distribution', [{
+                x: view.histogram.scores,
+                y: view.histogram.counts,
+                type: 'bar'
+            }], {
+                title: '评分分布',
+                xaxis: { title: '评分' },
+                yaxis: { title: '数量' }
+            });
+
+            // 绘制课程评分图（箱线图使用预先计算的分位数）
+            const courseData = view.courses.map(course => ({
+                type: 'box',
+                name: course.code,
+                q1: [course.q1],
+                median: [course.median],
+                q3: [course.q3],
+                lowerfence: [course.min],
+                upperfence: [course.max]
+            }));
+
+            Plotly.newPlot('course-ratings', courseData, {
+                title: '课程评分分布',
+                xaxis: { title: '课程代码' },
+                yaxis: { title: '评分' }
+            });
+            // 点击箱线图打开课程报告页（重绘时先移除旧的监听）
+            const courseChart = document.getElementById('course-ratings');
+            courseChart.removeAllListeners('plotly_click');
+            courseChart.on('plotly_click', e => showCourseDetails(e.points[0].data.name));
 
-def build_static():
-    # 获取当前目录
-    current_dir = Path(__file__).parent
+            // 绘制教师评分雷达图（排名第一的教师）
+            const topTeacher = view.teachers[0];
+            Plotly.newPlot('teacher-radar', topTeacher ? [{
+                r: topTeacher.dimensions,
+                theta: view.dimensions.categories,
+                type: 'scatterpolar',
+                fill: 'toself',
+                name: topTeacher.name
+            }] : [], {
+                polar: {
+                    radialaxis: {
+                        visible: true,
+                        range: [0, 10]
+                    }
+                }
+            });
+
+            // 绘制评分维度分析图
+            Plotly.newPlot('rating-dimensions', [{
+                x: view.dimensions.categories,
+                y: view.dimensions.means,
+                type: 'bar'
+            }], {
+                title: '各维度平均分',
+                xaxis: { title: '评分维度' },
+                yaxis: { title: '平均分' }
+            });
+
+            // 绘制每日平均分趋势图
+            Plotly.newPlot('daily-trend', [{
+                x: view.daily.dates,
+                y: view.daily.means,
+                type: 'scatter',
+                mode: 'lines'
+            }], {
+                title: '每日平均分趋势',
+                xaxis: { title: '日期' },
+                yaxis: { title: '平均分' }
+            });
+        }
+
+        // 页面加载完成后加载数据
+        window.onload = loadData;
+
+        // 筛选器事件处理
+        document.getElementById('category-filter').addEventListener('change', updateFilters);
+        document.getElementById('course-filter').addEventListener('change', updateFilters);
+        document.getElementById('teacher-filter').addEventListener('change', updateFilters);
+        document.getElementById('student-filter').addEventListener('change', updateFilters);
+        // 滑块拖动时立即更新显示的分数，停止拖动后再重新聚合
+        const debouncedUpdateFilters = debounce(updateFilters, FILTER_DEBOUNCE_MS);
+        document.getElementById('score-range').addEventListener('input', function(e) {
+            document.getElementById('min-score-display').textContent = e.target.value;
+            debouncedUpdateFilters();
+        });
+        document.getElementById('start-date').addEventListener('change', updateFilters);
+        document.getElementById('end-date').addEventListener('change', updateFilters);
+
+        function updateFilters() {
+            // 数据已缓存在内存中，只重新筛选、聚合并更新图表
+            loadData();
+        }
+
+        // 报告页及头像文件名，与 build_static.py 中的 report_key 保持一致
+        function reportKey(key) {
+            return String(key).replace(/[\\/:*?"<>|\s]/g, '_');
+        }
+
+        function reportPage(kind, key) {
+            return kind + '/' + encodeURIComponent(reportKey(key)) + '.html';
+        }
+
+        function showTeacherDetails(teacherId) {
+            // 打开教师报告页
+            window.location.href = reportPage('teachers', teacherId);
+        }
+
+        function showCourseDetails(courseCode) {
+            // 打开课程报告页
+            window.location.href = reportPage('courses', courseCode);
+        }
+"""
+
+# 报告页脚本：只加载本页的数据切片（普通字符串，插入 HTML 时不经过 f-string 转义）
+REPORT_JS = r"""
+        function formatScore(value) {
+            return value === null ? '-' : value.toFixed(1);
+        }
+
+        function render(report) {
+            document.getElementById('report-count').textContent = report.count;
+            document.getElementById('report-mean').textContent = formatScore(report.mean);
+
+            // 评分维度雷达图
+            Plotly.newPlot('report-radar', [{
+                r: report.dimensions.means,
+                theta: report.dimensions.categories,
+                type: 'scatterpolar',
+                fill: 'toself'
+            }], {
+                polar: { radialaxis: { visible: true, range: [0, 10] } }
+            });
+
+            // 每日平均分趋势
+            Plotly.newPlot('report-trend', [{
+                x: report.trend.dates,
+                y: report.trend.means,
+                type: 'scatter',
+                mode: 'lines+markers'
+            }], {
+                xaxis: { title: '日期' },
+                yaxis: { title: '平均分' }
+            });
+
+            // 分项统计，点击柱条跳转到对应的课程或教师报告
+            Plotly.newPlot('report-breakdown', [{
+                x: report.breakdown.labels,
+                y: report.breakdown.means,
+                text: report.breakdown.counts.map(count => count + ' 课时'),
+                type: 'bar'
+            }], {
+                yaxis: { title: '平均分' }
+            });
+            document.getElementById('report-breakdown').on('plotly_click', function(e) {
+                window.location.href = report.breakdown.links[e.points[0].pointIndex];
+            });
+        }
+
+        // 离线导出的切片内联在页面中（本地文件中无法 fetch）
+        (SLICE ? Promise.resolve(SLICE) : fetch(SLICE_URL).then(r => r.json())).then(render);
+"""
+
+def render_report_page(report):
+    """生成教师或课程报告页 HTML，slice_url 为本页数据切片相对于页面的地址（离线导出时为 None，
+    切片 slice 直接内联），head 为样式与脚本引用"""
+    breakdown_title = '课程分项' if report['kind'] == 'teacher' else '教师分项'
+    subtitle = report['subtitle'] or ''
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{html.escape(report['title'])}</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    {report['head']}
+    <style>
+        body {{ padding: 20px; }}
+        .chart {{ margin-bottom: 30px; }}
+        .stats-value {{ font-size: 2.4rem; font-weight: 700; }}
+    </style>
+</head>
+<body>
+    <div class="container-fluid">
+        <a href="../index.html">← 返回看板</a>
+        <h1 class="mt-2">{html.escape(report['title'])}</h1>
+        <p class="text-muted">{html.escape(subtitle)}</p>
+        <div class="row mb-4">
+            <div class="col-md-2"><div class="stats-value" id="report-count">-</div><div>总课时</div></div>
+            <div class="col-md-2"><div class="stats-value" id="report-mean">-</div><div>平均总分</div></div>
+        </div>
+        <div class="row">
+            <div class="col-md-6"><h5>评分维度</h5><div id="report-radar" class="chart"></div></div>
+            <div class="col-md-6"><h5>{breakdown_title}</h5><div id="report-breakdown" class="chart"></div></div>
+        </div>
+        <div class="row">
+            <div class="col-12"><h5>评分趋势</h5><div id="report-trend" class="chart"></div></div>
+        </div>
+    </div>
+    <script>
+        const SLICE_URL = {json.dumps(report['slice_url'])};
+        const SLICE = {inline_json(report['slice'])};
+{REPORT_JS}
+    </script>
+</body>
+</html>
+"""
+
+def write_report_page(path, report):
+    """生成并写出一个报告页，内容未变化时不重写，返回是否写出"""
+    path = Path(path)
+    data = render_report_page(report).encode('utf-8')
+    if compressed_exists(path) and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    compress_file(path)
+    return True
+
+def write_report_batch(job):
+    """在进程池中处理一批同类实体：组装数据切片、写出（压缩）切片资源并生成报告页
+
+    返回 (切片资源映射, 写出数, 复用数, 页面相对路径列表, 有更新的页数)，主进程只需合并这些记录。
+    """
+    output_dir = Path(job['output_dir'])
+    kind = job['kind']
+    id_column = REPORT_KINDS[kind]['id']
+    trends = job['trends'].groupby(id_column, sort=False)
+    breakdowns = job['breakdowns'].groupby(id_column, sort=False)
+    writer = AssetWriter(output_dir)
+    pages = []
+    pages_written = 0
+    for _, row in job['rows'].iterrows():
+        key = row[id_column]
+        report = build_report_slice(kind, row, trends.get_group(key), breakdowns.get_group(key),
+                                    job['categories'], job['course_titles'])
+        name = report_key(key)
+        if job['offline']:
+            # 离线导出的切片直接内联进报告页
+            slice_url, inline = None, report
+        else:
+            slice_url, inline = '../' + writer.write_json(f'data/{kind}/{name}.json', report), None
+        page = f'{kind}/{name}.html'
+        pages.append(page)
+        pages_written += write_report_page(output_dir / page, {
+            'kind': report['kind'],
+            'title': report['title'],
+            'subtitle': report['subtitle'],
+            'slice_url': slice_url,
+            'slice': inline,
+            'head': job['head']
+        })
+    return writer.assets, writer.written, writer.reused, pages, pages_written
+
+def reuse_report_pages(report_tables, touched, writer, previous_pages, offline=False):
+    """沿用会话没有变化的教师、课程上次生成的报告页与数据切片
+
+    touched 为 {页面目录: 会话有变化的实体 ID 集合}，为 None 时全部重新生成；页面或切片已不存在的实体同样重新生成。
+    返回 (仍需生成的分组统计, 沿用的页面相对路径列表)。
+    """
+    remaining = {}
+    kept = []
+    for kind, (rows, trends, breakdowns) in report_tables.items():
+        id_column = REPORT_KINDS[kind]['id']
+        rebuild = set()
+        for key in rows[id_column]:
+            name = report_key(key)
+            page = f'{kind}/{name}.html'
+            path = writer.output_dir / page
+            if (touched is not None and key not in touched[kind] and page in previous_pages
+                    and compressed_exists(path)
+                    and (offline or writer.keep(f'data/{kind}/{name}.json'))):
+                kept.append(page)
+            else:
+                rebuild.add(key)
+        remaining[kind] = tuple(table[table[id_column].isin(rebuild)] for table in (rows, trends, breakdowns))
+    return remaining, kept
+
+def write_report_pages(output_dir, report_tables, categories, course_titles, writer, head, offline=False, workers=None):
+    """用进程池并行生成全部教师、课程报告页
+
+    主进程只把上卷好的分组统计按实体切分为若干批，切片组装、序列化、压缩与页面生成都在工作进程中完成；
+    切片资源登记到 writer，返回 (页面相对路径列表, 有更新的页数)。
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    for kind, (rows, trends, breakdowns) in report_tables.items():
+        if rows.empty:
+            continue
+        id_column = REPORT_KINDS[kind]['id']
+        # 实体按顺序连续分批，三张表各按批次分组一次，避免逐个实体过滤整表
+        batch_count = min(len(rows), workers * 4)
+        batches = pd.Series(np.arange(len(rows)) * batch_count // len(rows), index=rows[id_column].to_numpy())
+        trend_batches = dict(list(trends.groupby(trends[id_column].map(batches).to_numpy(), sort=False)))
+        breakdown_batches = dict(list(breakdowns.groupby(breakdowns[id_column].map(batches).to_numpy(), sort=False)))
+        for batch, batch_rows in rows.groupby(batches.to_numpy(), sort=True):
+            jobs.append({
+                'output_dir': str(output_dir),
+                'kind': kind,
+                'rows': batch_rows,
+                'trends': trend_batches[batch],
+                'breakdowns': breakdown_batches[batch],
+                'categories': categories,
+                'course_titles': course_titles if kind == 'courses' else {},
+                'head': head,
+                'offline': offline
+            })
+    pages = []
+    pages_written = 0
+    if not jobs:
+        return pages, pages_written
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for assets, written, reused, batch_pages, batch_written in pool.map(write_report_batch, jobs):
+            writer.assets.update(assets)
+            writer.written += written
+            writer.reused += reused
+            pages.extend(batch_pages)
+            pages_written += batch_written
+    return pages, pages_written
+
+def build_static(offline=False, data_dir=None, cache_dir=None):
+    """导出静态仪表板；offline 为 True 时不依赖任何外部 CDN，且不使用 fetch，可直接从本地文件打开或在内网访问
+
+    data_dir 为数据目录（默认为脚本所在目录），导出到其下的 static_export。
+    构建清单与按月分区缓存保存在 cache_dir（默认为数据目录下的 .static_build_cache，不随导出目录发布）：
+    上次构建后只新增了追加日志分段时只读取新分段，否则读取完整历史并按分区内容哈希比对；只有会话变化的月份重新计算立方体单元与列文件，只有涉及的教师、课程重新生成报告页。
+    """
+    # 获取数据目录
+    current_dir = Path(data_dir) if data_dir else Path(__file__).parent
     
-    # 创建输出目录
     output_dir = current_dir / "static_export"
-    if output_dir.exists():
-        shutil.rmtree(output_dir)
-    output_dir.mkdir()
+    cache_dir = Path(cache_dir) if cache_dir else current_dir / BUILD_CACHE
+    log_dir = current_dir / 'ratings_log'
+    input_files = ['ratings_meta.json', 'teachers.json', 'students.json', 'courses.json',
+                   'course_ratings_compact.json', 'course_ratings_compact.ndjson', 'course_ratings.parquet']
+    inputs = input_digests(current_dir, input_files, log_dir)
+    options = {'offline': offline, 'plotly': get_plotlyjs_version()}
     
-    # 复制所有数据文件
-    data_files = [
-        "course_ratings_compact.json",
-        "ratings_meta.json",
-        "students.json",
-        "teachers.json",
-        "courses.json"
-    ]
+    # 读取上次构建清单；没有清单时无法判断目录中已有文件的来源，整体重建
+    manifest = load_manifest(cache_dir)
+    if manifest is None:
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        manifest = {'inputs': {}, 'options': {}, 'dictionaries': {}, 'assets': {}}
+    output_dir.mkdir(exist_ok=True)
+    cache_dir.mkdir(parents=True, exist_ok=True)
     
-    for file in data_files:
-        if (current_dir / file).exists():
-            shutil.copy2(current_dir / file, output_dir / file)
+    # 输入均未变化且上次的产物完整时无需重建
+    outputs = ["index.html"] + list(manifest['assets'].values()) + manifest.get('pages', [])
+    if manifest['inputs'] == inputs and manifest.get('options') == options and all(
+            compressed_exists(output_dir / path) for path in outputs):
+        print(f"输入未变化，跳过重建: {output_dir}")
+        return
+    if brotli is None:
+        print("警告: 未安装 brotli（pip install brotli），本次只生成 .gz 预压缩文件，不生成 .br")
     
     # 加载数据
-    with open(current_dir / 'ratings_meta.json', 'r', encoding='utf-8') as f:
-        ratings_meta = json.load(f)
-    
-    with open(current_dir / 'course_ratings_compact.json', 'r', encoding='utf-8') as f:
-        ratings_compact = json.load(f)
+    ratings_meta = load_ratings_meta(current_dir / 'ratings_meta.json')
+    measures = ['total_score'] + [f'{cat}_score' for cat in ratings_meta]
     
     with open(current_dir / 'teachers.json', 'r', encoding='utf-8') as f:
         teachers_data = json.load(f)
@@ -51,53 +1324,127 @@ def build_static():
     with open(current_dir / 'courses.json', 'r', encoding='utf-8') as f:
         courses_data = json.load(f)
     
-    # 将数据转换为DataFrame
-    def flatten_ratings_compact(ratings):
-        flattened_data = []
-        for rating in ratings:
-            base_data = {
-                'session_id': rating['session_id'],
-                'student_id': rating['student_id'],
-                'teacher_id': rating['teacher_id'],
-                'course_code': rating['course_code'],
-                'schedule': rating['schedule'],
-                'total_score': rating['ratings']['total_score'],
-            }
-            for cat, cat_info in rating['ratings']['ratings'].items():
-                base_data[f'{cat}_score'] = cat_info['score']
-                for cidx, score in cat_info['criteria'].items():
-                    base_data[f'{cat}_{cidx}'] = score
-            flattened_data.append(base_data)
-        return pd.DataFrame(flattened_data)
+    reference = [pd.DataFrame(teachers_data), pd.DataFrame(students_data), pd.DataFrame(courses_data)]
     
-    df = flatten_ratings_compact(ratings_compact)
+    # 构建代码、导出选项或评分元数据变化时，缓存的分区统计全部失效
+    cache_key = hashlib.sha256(json.dumps(
+        [options] + [inputs.get(name) for name in BUILD_SOURCES + ['ratings_meta.json']]).encode('utf-8')).hexdigest()
+    cache = PartitionCache(cache_dir / 'partitions')
+    cached = manifest.get('partitions', {}) if manifest.get('cache_key') == cache_key else {}
+    complete = all(cache.exists(month, record['digest']) for month, record in cached.items())
+    cached = {month: record for month, record in cached.items() if cache.exists(month, record['digest'])}
     
-    # 合并教师信息
-    teachers_df = pd.DataFrame(teachers_data)
-    df = df.merge(teachers_df[['Teacher ID', 'Expertise', 'Teacher Name']], 
-                  left_on='teacher_id', 
-                  right_on='Teacher ID', 
-                  how='left')
+    # 找出会话有变化的月份分区，以及其中涉及的教师与课程
+    touched = {'teachers': set(), 'courses': set()}
     
-    # 合并学生信息
-    students_df = pd.DataFrame(students_data)
-    df = df.merge(students_df[['Student ID', 'Student Name']],
-                  left_on='student_id',
-                  right_on='Student ID',
-                  how='left')
+    def touch(frame):
+        touched['teachers'].update(frame['teacher_id'].dropna())
+        touched['courses'].update(frame['course_code'].dropna())
     
-    # 合并课程信息
-    courses_df = pd.DataFrame(courses_data)
-    df = df.merge(courses_df[['Course Code', 'Department']],
-                  left_on='course_code',
-                  right_on='Course Code',
-                  how='left')
-    df = df.rename(columns={'Department': 'Business Category'})
+    segments = delta_segments(inputs, manifest['inputs'], f'{log_dir.name}/') if cached and complete else None
+    frames = {}
+    removed = set()
+    if segments is not None:
+        # 只新增了追加日志分段：只读取新分段，并入所在月份缓存的分区会话
+        if segments:
+            delta = concat_ratings_frames([load_segment_frame(current_dir / name, ratings_meta) for name in segments])
+            delta = enrich_ratings_frame(delta, *reference)
+            for month, rows in split_months(delta, ratings_meta, start=manifest['rows']).items():
+                touch(rows)
+                if month in cached:
+                    rows = pd.concat([cache.load(month, cached[month]['digest'], 'rows'), rows], ignore_index=True)
+                frames[month] = rows
+        months = set(cached) | set(frames)
+        rows_total = manifest['rows'] + (len(delta) if segments else 0)
+    else:
+        # 其余输入有变化：读取完整评分历史（优先使用列式存储，并包含追加日志中尚未合并的分段），
+        # 按分区内容哈希比对，合并分段等不改变会话的操作不会触发重新计算
+        df = load_ratings_history(ratings_meta,
+                                  log_dir=log_dir,
+                                  json_path=current_dir / 'course_ratings_compact.json',
+                                  ndjson_path=current_dir / 'course_ratings_compact.ndjson',
+                                  store_path=current_dir / 'course_ratings.parquet')
+        
+        # 合并教师、学生、课程信息
+        df = enrich_ratings_frame(df, *reference)
+        present = split_months(df, ratings_meta)
+        rows_total = len(df)
+        del df
+        for month, rows in present.items():
+            if month not in cached or cached[month]['digest'] != partition_digest(rows):
+                touch(rows)
+                frames[month] = rows
+        months = set(present)
+        removed = set(cached) - months
+        for month in (set(frames) | removed) & set(cached):
+            touch(cache.load(month, cached[month]['digest'], 'stats')['cells'])
+    
+    # 只为有变化的月份计算立方体单元与课程总分计数，其余月份读取缓存；各月份日期互不重叠，直接拼接
+    digests = {month: cached[month]['digest'] for month in months if month not in frames}
+    stats = {}
+    for month, frame in sorted(frames.items()):
+        digests[month] = partition_digest(frame)
+        stats[month] = build_partition(frame, measures)
+        cache.save(month, digests[month], frame, stats[month])
+    month_stats = [stats[month] if month in stats else cache.load(month, digests[month], 'stats') for month in sorted(months)]
+    cells = pd.concat([entry['cells'] for entry in month_stats], ignore_index=True)
+    cube = RatingCube(cells.sort_values('first_row', kind='stable', ignore_index=True), None, measures)
+    scores = (
+        pd.concat([entry['scores'] for entry in month_stats], ignore_index=True)
+        .groupby(['course_code', 'total_score'], dropna=False)['count'].sum().reset_index()
+    )
+    teacher_names = cube.cells.drop_duplicates('teacher_id').set_index('teacher_id')['Teacher Name']
+    student_names = sorted(set().union(*(entry['students'] for entry in month_stats)))
+    
+    # 写出预聚合分片（默认视图）、按月分区的原始会话二进制列文件与筛选 Worker（下钻时按需加载），
+    # 没有变化的月份沿用上次的列文件，内容未变化的其他文件也直接复用
+    # 离线导出可直接从本地文件打开：默认视图与 Worker 内联进页面，其余数据写为 <script> 加载的数据脚本
+    writer = AssetWriter(output_dir, manifest['assets'])
+    inline_data = {}
+    aggregates = build_aggregates(cube, scores, ratings_meta)
+    for name, payload in aggregates.items():
+        if offline:
+            inline_data[f"agg/{name}.json"] = payload
+        else:
+            writer.write_json(f"data/agg/{name}.json", payload)
+    dictionaries = manifest['dictionaries']
+    partitions = write_columns(frames, ratings_meta, writer, dictionaries,
+                               {month: cached[month] for month in months if month not in frames},
+                               lambda month: cache.load(month, digests[month], 'rows'), offline)
+    columns = columns_manifest(partitions, ratings_meta, dictionaries, teacher_names)
+    if offline:
+        writer.write("data/columns.json.js", data_script("columns.json", columns))
+    else:
+        writer.write_json("data/columns.json", columns)
+        writer.write("filter_worker.js", WORKER_JS.encode('utf-8'))
+    if offline:
+        # 离线导出：Plotly 使用 plotly 包自带的完整压缩版，头像在本地生成
+        writer.write("vendor/plotly.min.js", get_plotlyjs().encode('utf-8'))
+        for teacher_id, name in teacher_names.items():
+            writer.write(f"avatars/{report_key(teacher_id)}.svg", render_avatar_svg(str(name)).encode('utf-8'))
     
-    # 解析schedule为多列
-    schedule_df = pd.json_normalize(df['schedule'])
-    schedule_df.columns = [f'schedule_{col}' for col in schedule_df.columns]
-    df = pd.concat([df.drop(columns=['schedule']), schedule_df], axis=1)
+    # 每位教师、每门课程的报告页只加载自己的数据切片；会话没有变化的实体沿用上次的页面与切片，
+    # 其余实体的切片组装、序列化、压缩与页面生成由进程池并行完成（教师、课程信息变化时全部重新生成）
+    course_titles = {course['Course Code']: course.get('Course Title') for course in courses_data}
+    if not cached or any(manifest['inputs'].get(name) != inputs.get(name)
+                         for name in ['teachers.json', 'students.json', 'courses.json']):
+        touched = None
+    report_tables, pages = reuse_report_pages(build_report_tables(cube), touched, writer,
+                                              set(manifest.get('pages', [])), offline)
+    built, pages_written = write_report_pages(output_dir, report_tables, list(ratings_meta), course_titles, writer,
+                                              page_head(offline, writer.assets, prefix='../'), offline)
+    pages += built
+    writer.remove_stale(manifest['assets'])
+    assets = dict(sorted(writer.assets.items()))
+    for page in set(manifest.get('pages', [])) - set(pages):
+        for stale in [output_dir / page, Path(f'{output_dir / page}.gz'), Path(f'{output_dir / page}.br')]:
+            stale.unlink(missing_ok=True)
+    
+    defaults = {
+        'startDate': cube.cells['schedule_start_date'].min(),
+        'endDate': cube.cells['schedule_start_date'].max(),
+        'minScore': aggregates['summary']['min']
+    }
     
     # 创建HTML文件
     with open(output_dir / "index.html", "w", encoding="utf-8") as f:
@@ -108,8 +1455,7 @@ def build_static():
     <title>课程评分分析看板</title>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    {page_head(offline, assets)}
     <style>
         body {{ padding: 20px; }}
         .chart {{ margin-bottom: 30px; }}
@@ -190,8 +1536,8 @@ def build_static():
         <!-- 日期范围筛选 -->
         <div class="mb-3">
             <label class="form-label">选择日期范围</label>
-            <input type="date" class="form-control" id="start-date" value="{df['schedule_start_date'].min()}">
-            <input type="date" class="form-control mt-2" id="end-date" value="{df['schedule_start_date'].max()}">
+            <input type="date" class="form-control" id="start-date" value="{defaults['startDate']}">
+            <input type="date" class="form-control mt-2" id="end-date" value="{defaults['endDate']}">
         </div>
         
         <!-- 业务分类筛选 -->
@@ -199,7 +1545,7 @@ def build_static():
             <label class="form-label">选择业务分类（课程所属学科）</label>
             <select class="form-select" id="category-filter">
                 <option value="">全部</option>
-                {''.join(f'<option value="{cat}">{cat}</option>' for cat in sorted(df['Business Category'].dropna().unique()))}
+                {''.join(f'<option value="{cat}">{cat}</option>' for cat in sorted(cube.cells['Business Category'].dropna().unique()))}
             </select>
         </div>
         
@@ -208,7 +1554,7 @@ def build_static():
             <label class="form-label">选择课程</label>
             <select class="form-select" id="course-filter">
                 <option value="">全部</option>
-                {''.join(f'<option value="{code}">{code}</option>' for code in sorted(df['course_code'].unique()))}
+                {''.join(f'<option value="{code}">{code}</option>' for code in sorted(cube.cells['course_code'].unique()))}
             </select>
         </div>
         
@@ -217,7 +1563,7 @@ def build_static():
             <label class="form-label">选择教师</label>
             <select class="form-select" id="teacher-filter">
                 <option value="">全部</option>
-                {''.join(f'<option value="{name}">{name}</option>' for name in sorted(df['Teacher Name'].unique()))}
+                {''.join(f'<option value="{name}">{name}</option>' for name in sorted(cube.cells['Teacher Name'].unique()))}
             </select>
         </div>
         
@@ -226,7 +1572,7 @@ def build_static():
             <label class="form-label">选择学生</label>
             <select class="form-select" id="student-filter">
                 <option value="">全部</option>
-                {''.join(f'<option value="{name}">{name}</option>' for name in sorted(df['Student Name'].unique()))}
+                {''.join(f'<option value="{name}">{name}</option>' for name in student_names)}
             </select>
         </div>
         
@@ -234,13 +1580,13 @@ def build_static():
         <div class="mb-3">
             <label class="form-label">选择总分范围</label>
             <input type="range" class="form-range" id="score-range" 
-                   min="{df['total_score'].min()}" 
-                   max="{df['total_score'].max()}" 
+                   min="{aggregates['summary']['min']:.1f}" 
+                   max="{aggregates['summary']['max']:.1f}" 
                    step="0.1"
-                   value="{df['total_score'].min()}">
+                   value="{aggregates['summary']['min']:.1f}">
             <div class="d-flex justify-content-between">
-                <span id="min-score-display">{df['total_score'].min():.1f}</span>
-                <span id="max-score-display">{df['total_score'].max():.1f}</span>
+                <span id="min-score-display">{aggregates['summary']['min']:.1f}</span>
+                <span id="max-score-display">{aggregates['summary']['max']:.1f}</span>
             </div>
         </div>
     </div>
@@ -254,25 +1600,25 @@ def build_static():
             <div class="col-md-3">
                 <div class="stats-card">
                     <div class="stats-label">总课程数</div>
-                    <div class="stats-value" id="total-courses">{len(df)}</div>
+                    <div class="stats-value" id="total-courses">{aggregates['summary']['count']}</div>
                 </div>
             </div>
             <div class="col-md-3">
                 <div class="stats-card">
                     <div class="stats-label">平均总分</div>
-                    <div class="stats-value" id="avg-score">{df['total_score'].mean():.1f}</div>
+                    <div class="stats-value" id="avg-score">{cube.means(['total_score'])['total_score']:.1f}</div>
                 </div>
             </div>
             <div class="col-md-3">
                 <div class="stats-card">
                     <div class="stats-label">最高分</div>
-                    <div class="stats-value" id="max-score">{df['total_score'].max():.1f}</div>
+                    <div class="stats-value" id="max-score">{aggregates['summary']['max']:.1f}</div>
                 </div>
             </div>
             <div class="col-md-3">
                 <div class="stats-card">
                     <div class="stats-label">最低分</div>
-                    <div class="stats-value" id="min-score">{df['total_score'].min():.1f}</div>
+                    <div class="stats-value" id="min-score">{aggregates['summary']['min']:.1f}</div>
                 </div>
             </div>
         </div>
@@ -323,240 +1669,60 @@ def build_static():
                 </div>
             </div>
         </div>
-    </div>
-
-    <script>
-        // 加载数据
-        async function loadData() {{
-            const [ratings, meta, students, teachers, courses] = await Promise.all([
-                fetch('course_ratings_compact.json').then(r => r.json()),
-                fetch('ratings_meta.json').then(r => r.json()),
-                fetch('students.json').then(r => r.json()),
-                fetch('teachers.json').then(r => r.json()),
-                fetch('courses.json').then(r => r.json())
-            ]);
-
-            // 应用筛选条件
-            const filteredRatings = applyFilters(ratings);
-            
-            // 更新统计信息
-            updateStats(filteredRatings);
-            
-            // 更新教师卡片
-            updateTeacherCards(filteredRatings, teachers);
-            
-            // 绘制图表
-            drawCharts(filteredRatings, meta);
-        }}
-
-        function applyFilters(ratings) {{
-            const startDate = document.getElementById('start-date').value;
-            const endDate = document.getElementById('end-date').value;
-            const category = document.getElementById('category-filter').value;
-            const course = document.getElementById('course-filter').value;
-            const teacher = document.getElementById('teacher-filter').value;
-            const student = document.getElementById('student-filter').value;
-            const minScore = parseFloat(document.getElementById('score-range').value);
-
-            return ratings.filter(rating => {{
-                // 日期筛选
-                if (startDate && rating.schedule.start_date < startDate) return false;
-                if (endDate && rating.schedule.start_date > endDate) return false;
-                
-                // 业务分类筛选
-                if (category && rating.business_category !== category) return false;
-                
-                // 课程筛选
-                if (course && rating.course_code !== course) return false;
-                
-                // 教师筛选
-                if (teacher && rating.teacher_name !== teacher) return false;
-                
-                // 学生筛选
-                if (student && rating.student_name !== student) return false;
-                
-                // 分数筛选
-                if (rating.ratings.total_score < minScore) return false;
-                
-                return true;
-            }});
-        }}
-
-        function updateStats(ratings) {{
-            const totalScore = ratings.reduce((sum, r) => sum + r.ratings.total_score, 0);
-            const avgScore = totalScore / ratings.length;
-            const maxScore = Math.max(...ratings.map(r => r.ratings.total_score));
-            const minScore = Math.min(...ratings.map(r => r.ratings.total_score));
-
-            document.getElementById('total-courses').textContent = ratings.length;
-            document.getElementById('avg-score').textContent = avgScore.toFixed(1);
-            document.getElementById('max-score').textContent = maxScore.toFixed(1);
-            document.getElementById('min-score').textContent = minScore.toFixed(1);
-        }}
 
-        function updateTeacherCards(ratings, teachers) {{
-            // 获取筛选后的教师评分
-            const teacherScores = {{}};
-            ratings.forEach(r => {{
-                if (!teacherScores[r.teacher_id]) {{
-                    teacherScores[r.teacher_id] = {{
-                        total: 0,
-                        count: 0,
-                        name: r.teacher_name,
-                        category: r.business_category
-                    }};
-                }}
-                teacherScores[r.teacher_id].total += r.ratings.total_score;
-                teacherScores[r.teacher_id].count += 1;
-            }});
-
-            // 计算平均分并排序
-            const teacherList = Object.entries(teacherScores)
-                .map(([id, data]) => ({{
-                    id,
-                    name: data.name,
-                    category: data.category,
-                    avgScore: data.total / data.count
-                }}))
-                .sort((a, b) => b.avgScore - a.avgScore)
-                .slice(0, 5);
-
-            // 更新教师卡片
-            const cardsContainer = document.getElementById('teacher-cards');
-            cardsContainer.innerHTML = teacherList.map(teacher => `
-                <div class="teacher-card" onclick="showTeacherDetails('${teacher.id}')">
-                    <img src="https://api.dicebear.com/7.x/micah/svg?seed=${teacher.name}" 
-                         class="teacher-avatar" alt="${teacher.name}">
-                    <div class="teacher-name">${teacher.name}</div>
-                    <div class="teacher-category">${teacher.category}</div>
+        <div class="row mt-4">
+            <div class="col-12">
+                <div class="card">
+                    <div class="card-body">
+                        <h5 class="card-title">评分趋势</h5>
+                        <div id="daily-trend" class="chart"></div>
+                    </div>
                 </div>
-            `).join('');
-        }}
-
-        function drawCharts(ratings, meta) {{
-            // 绘制评分分布图
-            const ratingCounts = {{}};
-            ratings.forEach(r => {{
-                const score = r.ratings.total_score;
-                ratingCounts[score] = (ratingCounts[score] || 0) + 1;
-            }});
-
-            Plotly.newPlot('rating-distribution', [{{
-                x: Object.keys(ratingCounts),
-                y: Object.values(ratingCounts),
-                type: 'bar'
-            }}], {{
-                title: '评分分布',
-                xaxis: {{ title: '评分' }},
-                yaxis: {{ title: '数量' }}
-            }});
-
-            // 绘制课程评分图
-            const courseRatings = {{}};
-            ratings.forEach(r => {{
-                if (!courseRatings[r.course_code]) {{
-                    courseRatings[r.course_code] = [];
-                }}
-                courseRatings[r.course_code].push(r.ratings.total_score);
-            }});
-
-            const courseData = Object.entries(courseRatings).map(([courseCode, scores]) => ({{
-                y: scores,
-                type: 'box',
-                name: courseCode
-            }}));
-
-            Plotly.newPlot('course-ratings', courseData, {{
-                title: '课程评分分布',
-                xaxis: {{ title: '课程代码' }},
-                yaxis: {{ title: '评分' }}
-            }});
-
-            // 绘制教师评分雷达图
-            const teacherRatings = {{}};
-            ratings.forEach(r => {{
-                if (!teacherRatings[r.teacher_id]) {{
-                    teacherRatings[r.teacher_id] = {{}};
-                    Object.keys(meta).forEach(cat => {{
-                        teacherRatings[r.teacher_id][cat] = [];
-                    }});
-                }}
-                Object.entries(r.ratings.ratings).forEach(([cat, info]) => {{
-                    teacherRatings[r.teacher_id][cat].push(info.score);
-                }});
-            }});
-
-            const teacherId = Object.keys(teacherRatings)[0];
-            const categories = Object.keys(meta);
-            const scores = categories.map(cat => 
-                teacherRatings[teacherId][cat].reduce((a, b) => a + b, 0) / 
-                teacherRatings[teacherId][cat].length
-            );
-
-            Plotly.newPlot('teacher-radar', [{{
-                r: scores,
-                theta: categories,
-                type: 'scatterpolar',
-                fill: 'toself'
-            }}], {{
-                polar: {{
-                    radialaxis: {{
-                        visible: true,
-                        range: [0, 10]
-                    }}
-                }}
-            }});
-
-            // 绘制评分维度分析图
-            const dimensionScores = {{}};
-            categories.forEach(cat => {{
-                dimensionScores[cat] = ratings.reduce((sum, r) => 
-                    sum + r.ratings.ratings[cat].score, 0) / ratings.length;
-            }});
-
-            Plotly.newPlot('rating-dimensions', [{{
-                x: categories,
-                y: Object.values(dimensionScores),
-                type: 'bar'
-            }}], {{
-                title: '各维度平均分',
-                xaxis: {{ title: '评分维度' }},
-                yaxis: {{ title: '平均分' }}
-            }});
-        }}
-
-        // 页面加载完成后加载数据
-        window.onload = loadData;
-
-        // 筛选器事件处理
-        document.getElementById('category-filter').addEventListener('change', updateFilters);
-        document.getElementById('course-filter').addEventListener('change', updateFilters);
-        document.getElementById('teacher-filter').addEventListener('change', updateFilters);
-        document.getElementById('student-filter').addEventListener('change', updateFilters);
-        document.getElementById('score-range').addEventListener('input', function(e) {{
-            document.getElementById('min-score-display').textContent = e.target.value;
-            updateFilters();
-        }});
-        document.getElementById('start-date').addEventListener('change', updateFilters);
-        document.getElementById('end-date').addEventListener('change', updateFilters);
-
-        function updateFilters() {{
-            // 重新加载数据并更新图表
-            loadData();
-        }}
+            </div>
+        </div>
+    </div>
 
-        function showTeacherDetails(teacherId) {{
-            // 显示教师详细信息
-            console.log('Showing details for teacher:', teacherId);
-            // TODO: 实现教师详情弹窗
-        }}
+    <script>
+        // 默认视图对应的筛选条件，与预聚合分片一致
+        const DEFAULTS = {json.dumps(defaults, ensure_ascii=False)};
+        // 数据文件的逻辑路径 -> 带内容哈希的实际文件名
+        const ASSETS = {json.dumps(assets, ensure_ascii=False)};
+        // 离线导出：头像使用本地文件，数据不经 fetch 加载
+        const OFFLINE = {json.dumps(offline)};
+        // 离线导出内联的默认视图数据与 Worker 脚本
+        const INLINE_DATA = {inline_json(inline_data)};
+        const WORKER_SOURCE = {inline_json(WORKER_JS if offline else None)};
+{DASHBOARD_JS}
     </script>
 </body>
 </html>
 """)
+    compress_file(output_dir / "index.html")
+    
+    # 产物全部写出后再更新清单，中途失败时下次仍会重建
+    write_manifest(cache_dir, {
+        'inputs': inputs,
+        'options': options,
+        'dictionaries': dictionaries,
+        'cache_key': cache_key,
+        'rows': rows_total,
+        'partitions': {month: {'digest': digests[month], **partitions[month]} for month in sorted(months)},
+        'assets': assets,
+        'pages': pages
+    })
+    cache.prune(digests)
     
+    print(f"重新计算 {len(frames)} 个月份分区（共 {len(months)} 个）")
+    print(f"写出 {writer.written} 个文件，复用 {writer.reused} 个未变化的文件")
+    print(f"生成 {len(pages)} 个报告页，其中 {pages_written} 个有更新")
     print(f"静态仪表板已导出到: {output_dir}")
     print("请打开 index.html 文件查看仪表板")
 
 if __name__ == "__main__":
-    build_static() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="导出静态课程评分仪表板")
+    parser.add_argument('--offline', action='store_true',
+                        help="内置 Plotly 与样式、本地生成头像，导出页面不访问任何外部资源")
+    parser.add_argument('--data-dir', help="数据目录，默认为脚本所在目录（可指向 generate_load_dataset.py 生成的数据集）")
+    parser.add_argument('--cache-dir', help="构建清单与分区缓存目录，默认为数据目录下的 .static_build_cache（不会随导出目录发布）")
+    args = parser.parse_args()
+    build_static(offline=args.offline, data_dir=args.data_dir, cache_dir=args.cache_dir)
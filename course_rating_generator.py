@@ -1,7 +1,13 @@
+import argparse
 import json
+import os
 import random
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+from ratings_data import (RATINGS_JSON, RATINGS_NDJSON, RATINGS_STORE, RecordWriter, records_to_store, write_records,
+                          iter_records)
+from rating_scores import iter_session_ratings
 
 # 评分标准权重和细则索引
 RATING_WEIGHTS = {
@@ -81,76 +87,70 @@ teacher_expertise = {t['Teacher ID']: t['Expertise'] for t in teachers_data}
 with open('courses.json', 'r', encoding='utf-8') as f:
     courses_data = json.load(f)
 course_department = {c['Course Code']: c['Department'] for c in courses_data}
+# 学科 -> 课程的索引（课程按课程表顺序）
+department_courses = {}
+for code, dept in course_department.items():
+    department_courses.setdefault(dept, []).append(code)
 
-def generate_rating_compact():
-    """生成评分明细表（紧凑版，含完整课程时间信息）"""
+def generate_rating_compact(seed=None, ndjson=False):
+    """生成评分明细表（紧凑版，含完整课程时间信息），seed 为评分矩阵的随机种子
+
+    会话边生成边写出（ndjson 为 True 时写为 NDJSON），同时分块写入列式存储。
+    """
     with open('tutoring_sessions.json', 'r', encoding='utf-8') as f:
         tutoring_sessions = json.load(f)
-    course_ratings = []
-    for idx, session in enumerate(tutoring_sessions):
-        session_id = f"EZ{idx+1:06d}"
-        ratings = {}
-        total_score = 0
-        for cat, criteria_keys in RATING_CRITERIA.items():
-            cat_score = round(random.uniform(6.0, 9.5), 1)
-            criteria_scores = {k: round(random.uniform(cat_score-0.5, cat_score+0.5), 1) for k in criteria_keys}
-            ratings[cat] = {
-                'score': cat_score,
-                'criteria': criteria_scores
-            }
-            total_score += cat_score * RATING_WEIGHTS[cat]
-        # schedule字段优先用原始数据的完整时间，否则随机生成
-        if 'schedule' in session and all(k in session['schedule'] for k in ['start_date','start_time','end_time','duration_minutes']):
-            schedule = session['schedule']
-        else:
-            schedule = generate_course_schedule()
-        course_ratings.append({
-            'session_id': session_id,
-            'student_id': session['Student ID'],
-            'teacher_id': session['Teacher ID'],
-            'course_code': session['Course Code'],
-            'schedule': schedule,
-            'ratings': {
-                'ratings': ratings,
-                'total_score': round(total_score, 1)
-            }
-        })
-    # 再生成500节课程评分，老师不跨专业领域
-    students = list(set([s['student_id'] for s in course_ratings]))
-    teachers = list(set([s['teacher_id'] for s in course_ratings]))
-    for i in range(500):
-        student_id = random.choice(students)
-        teacher_id = random.choice(teachers)
-        possible_courses = [c for c, d in course_department.items() if d in teacher_expertise[teacher_id]]
-        if not possible_courses:
-            continue
-        course_code = random.choice(possible_courses)
-        session_id = f"EZ{len(course_ratings)+1:06d}"
-        ratings = {}
-        total_score = 0
-        for cat, criteria_keys in RATING_CRITERIA.items():
-            cat_score = round(random.uniform(6.0, 9.5), 1)
-            criteria_scores = {k: round(random.uniform(cat_score-0.5, cat_score+0.5), 1) for k in criteria_keys}
-            ratings[cat] = {
-                'score': cat_score,
-                'criteria': criteria_scores
-            }
-            total_score += cat_score * RATING_WEIGHTS[cat]
-        schedule = generate_course_schedule()
-        course_ratings.append({
-            'session_id': session_id,
+    rng = np.random.default_rng(seed)
+    # 按首次出现顺序去重（集合的遍历顺序随进程而变，会使相同种子得到不同结果）
+    students = list(dict.fromkeys(s['Student ID'] for s in tutoring_sessions))
+    teachers = list(dict.fromkeys(s['Teacher ID'] for s in tutoring_sessions))
+    # 每位教师专业领域内的课程只由学科索引计算一次，保持课程表顺序
+    course_order = {code: i for i, code in enumerate(course_department)}
+    teacher_possible_courses = {
+        teacher_id: sorted(
+            (code for dept in dict.fromkeys(teacher_expertise[teacher_id]) for code in department_courses.get(dept, [])),
+            key=course_order.get
+        )
+        for teacher_id in teachers
+    }
+
+    def iter_sessions():
+        """依次产出全部课程：原始会话，再加上新生成的500节"""
+        for session in tutoring_sessions:
+            # schedule字段优先用原始数据的完整时间，否则随机生成
+            if 'schedule' in session and all(k in session['schedule'] for k in ['start_date','start_time','end_time','duration_minutes']):
+                schedule = session['schedule']
+            else:
+                schedule = generate_course_schedule()
+            yield session['Student ID'], session['Teacher ID'], session['Course Code'], schedule
+        # 再生成500节课程评分，老师不跨专业领域
+        for i in range(500):
+            student_id = random.choice(students)
+            teacher_id = random.choice(teachers)
+            possible_courses = teacher_possible_courses[teacher_id]
+            if not possible_courses:
+                continue
+            course_code = random.choice(possible_courses)
+            yield student_id, teacher_id, course_code, generate_course_schedule()
+
+    # 评分按块抽取，边生成边写出，内存中只保留一块会话的评分矩阵
+    course_ratings = (
+        {
+            'session_id': f"EZ{idx+1:06d}",
             'student_id': student_id,
             'teacher_id': teacher_id,
             'course_code': course_code,
             'schedule': schedule,
-            'ratings': {
-                'ratings': ratings,
-                'total_score': round(total_score, 1)
-            }
-        })
-    with open('course_ratings_compact.json', 'w', encoding='utf-8') as f:
-        json.dump(course_ratings, f, ensure_ascii=False, indent=4)
-    print(f"已生成紧凑评分明细表，共{len(course_ratings)}条")
+            'ratings': rating
+        }
+        for idx, ((student_id, teacher_id, course_code, schedule), rating) in enumerate(
+            iter_session_ratings(iter_sessions(), rng, RATING_WEIGHTS, RATING_CRITERIA))
+    )
+    with RecordWriter(RATINGS_NDJSON if ndjson else RATINGS_JSON) as writer:
+        # 同时输出展开后的列式存储，供看板直接按列读取
+        records_to_store(writer.passthrough(course_ratings), criteria_meta_json)
+    # 明细文件在列式存储写完后才关闭，刷新存储的修改时间，避免看板误判存储已过期
+    os.utime(RATINGS_STORE)
+    print(f"已生成紧凑评分明细表，共{writer.count}条")
 
 def generate_rating(category):
     """生成某个类别的评分，80%的概率生成高于平均分的分数，但整体分数降低到原来的50%左右"""
@@ -205,55 +205,62 @@ def generate_course_ratings():
         "total_score": round(total_score, 1)
     }
 
-def generate_low_score_ratings_from_high():
-    """以高分组为基准，生成低分组数据，老师不跨学科，学生可随机分配，分数整体下调"""
-    # 读取高分组数据
-    with open('course_ratings.json', 'r', encoding='utf-8') as f:
-        high_ratings = json.load(f)
+def generate_low_score_ratings_from_high(ndjson=False):
+    """以高分组为基准，生成低分组数据，老师不跨学科，学生可随机分配，分数整体下调
+
+    逐条读取高分组并逐条写出低分组，ndjson 为 True 时写为 course_ratings_low.ndjson。
+    """
+    # 读取高分组数据（存在 NDJSON 时逐行流式读取）
+    high_path = 'course_ratings.ndjson' if os.path.exists('course_ratings.ndjson') else 'course_ratings.json'
+    high_ratings = iter_records(high_path)
     # 读取学生列表
     with open('students.json', 'r', encoding='utf-8') as f:
         students = json.load(f)
     student_ids = [s['Student ID'] for s in students]
 
-    low_ratings = []
-    for i, high in enumerate(high_ratings):
-        # 保持老师、课程、学科不变，学生可随机分配
-        student_id = random.choice(student_ids)
-        teacher_id = high['teacher_id']
-        course_code = high['course_code']
-        schedule = high['schedule']
-        # 生成低分评分（3~6分区间，细则分数也下调）
-        ratings = {}
-        for category, cat_info in high['ratings']['ratings'].items():
-            weight = cat_info['weight']
-            # 低分主分数
-            category_score = round(random.uniform(3.0, 6.0), 1)
-            # 细则分数在主分数±0.5区间
-            criteria_scores = {
-                criterion: max(1.0, min(6.0, round(random.uniform(category_score-0.5, category_score+0.5), 1)))
-                for criterion in cat_info['criteria']
-            }
-            ratings[category] = {
-                'weight': weight,
-                'score': category_score,
-                'criteria': criteria_scores
-            }
-        total_score = sum(r['score'] * r['weight'] for r in ratings.values())
-        low_ratings.append({
-            'session_id': f"LS{i+1:06d}",
-            'student_id': student_id,
-            'teacher_id': teacher_id,
-            'course_code': course_code,
-            'schedule': schedule,
-            'ratings': {
-                'ratings': ratings,
-                'total_score': round(total_score, 1)
+    def iter_low_ratings():
+        for i, high in enumerate(high_ratings):
+            # 保持老师、课程、学科不变，学生可随机分配
+            student_id = random.choice(student_ids)
+            teacher_id = high['teacher_id']
+            course_code = high['course_code']
+            schedule = high['schedule']
+            # 生成低分评分（3~6分区间，细则分数也下调）
+            ratings = {}
+            for category, cat_info in high['ratings']['ratings'].items():
+                weight = cat_info['weight']
+                # 低分主分数
+                category_score = round(random.uniform(3.0, 6.0), 1)
+                # 细则分数在主分数±0.5区间
+                criteria_scores = {
+                    criterion: max(1.0, min(6.0, round(random.uniform(category_score-0.5, category_score+0.5), 1)))
+                    for criterion in cat_info['criteria']
+                }
+                ratings[category] = {
+                    'weight': weight,
+                    'score': category_score,
+                    'criteria': criteria_scores
+                }
+            total_score = sum(r['score'] * r['weight'] for r in ratings.values())
+            yield {
+                'session_id': f"LS{i+1:06d}",
+                'student_id': student_id,
+                'teacher_id': teacher_id,
+                'course_code': course_code,
+                'schedule': schedule,
+                'ratings': {
+                    'ratings': ratings,
+                    'total_score': round(total_score, 1)
+                }
             }
-        })
-    with open('course_ratings_low.json', 'w', encoding='utf-8') as f:
-        json.dump(low_ratings, f, ensure_ascii=False, indent=4)
-    print(f"已生成低分组数据，共{len(low_ratings)}条")
+    total = write_records(iter_low_ratings(), 'course_ratings_low.ndjson' if ndjson else 'course_ratings_low.json')
+    print(f"已生成低分组数据，共{total}条")
 
 if __name__ == "__main__":
-    generate_rating_compact()
-    generate_low_score_ratings_from_high() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="生成课程评分明细表与低分组数据")
+    parser.add_argument('--seed', type=int, help="随机种子，指定后结果可复现")
+    parser.add_argument('--ndjson', action='store_true', help="评分明细与低分组写为 NDJSON（每行一条会话）")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    generate_rating_compact(args.seed, args.ndjson)
+    generate_low_score_ratings_from_high(args.ndjson) 
\ No newline at end of file
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+# 取值位图缓存上限，超出后淘汰最早缓存的位图
+BITMAP_CACHE_SIZE = 256
+
+def to_day_numbers(dates):
+    """将 'YYYY-MM-DD' 日期列转换为自 1970-01-01 起的天数，便于按数值做范围查找"""
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+def day_number(date):
+    """将单个日期转换为天数"""
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+def from_day_number(day):
+    """将天数转换回 datetime.date"""
+    return np.datetime64(int(day), 'D').astype(object)
+
+class FilterIndex:
+    """看板筛选索引
+
+    取值筛选列（业务分类、课程、教师、学生）：分类编码 + 按编码分组的行号倒排表，
+    查询某个取值时由倒排表生成行位图并缓存复用。
+    范围筛选列（日期、总分）：按值排序的数组及对应行号，范围查询为两次二分查找；
+    缺失值（NaN）排在末尾，另记录非缺失值的个数。
+    位图为 np.packbits 压缩后的字节数组，任意筛选组合即为位图按位与；
+    None 表示该维度不做限制。
+    """
+
+    def __init__(self, df, value_columns, range_columns):
+        self.size = len(df)
+        row_dtype = np.int32 if self.size < 2**31 else np.int64
+
+        self._codes = {}
+        self._uniques = {}
+        self._postings = {}
+        for col in value_columns:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            order = np.argsort(codes, kind='stable').astype(row_dtype)
+            # 编码 -1 为缺失值，不进入倒排表
+            offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._codes[col] = codes
+            self._uniques[col] = uniques
+            self._postings[col] = (order, offsets)
+
+        self._sorted = {}
+        self._valid = {}
+        for col, values in range_columns.items():
+            values = np.asarray(values)
+            order = np.argsort(values, kind='stable').astype(row_dtype)
+            self._sorted[col] = (values[order], order)
+            self._valid[col] = len(values) - np.count_nonzero(np.isnan(values)) if values.dtype.kind == 'f' else len(values)
+
+        self._bitmap_cache = {}
+
+    def _bitmap_from_rows(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def equals(self, column, value):
+        """取值等于 value 的行位图"""
+        key = (column, value)
+        if key not in self._bitmap_cache:
+            uniques = self._uniques[column]
+            code = uniques.get_loc(value) if value in uniques else None
+            if code is None:
+                rows = np.empty(0, dtype=np.int64)
+            else:
+                order, offsets = self._postings[column]
+                rows = order[offsets[code]:offsets[code + 1]]
+            if len(self._bitmap_cache) >= BITMAP_CACHE_SIZE:
+                self._bitmap_cache.pop(next(iter(self._bitmap_cache)), None)
+            self._bitmap_cache[key] = self._bitmap_from_rows(rows)
+        return self._bitmap_cache[key]
+
+    def between(self, column, low, high):
+        """取值落在闭区间 [low, high] 内的行位图"""
+        values, order = self._sorted[column]
+        start = np.searchsorted(values, low, side='left')
+        stop = np.searchsorted(values, high, side='right')
+        if start == 0 and stop == self.size:
+            return None
+        return self._bitmap_from_rows(order[start:stop])
+
+    def min(self, column):
+        """范围筛选列的全局最小值（跳过缺失值，全部缺失时为 NaN）"""
+        valid = self._valid[column]
+        return self._sorted[column][0][0] if valid else np.nan
+
+    def max(self, column):
+        """范围筛选列的全局最大值（跳过缺失值，全部缺失时为 NaN）"""
+        valid = self._valid[column]
+        return self._sorted[column][0][valid - 1] if valid else np.nan
+
+    def column_values(self, column, bitmap):
+        """位图选中行在范围筛选列上的取值"""
+        values, order = self._sorted[column]
+        selected = np.unpackbits(bitmap, count=self.size).view(bool)
+        return values[selected[order]]
+
+    def sorted_rows(self, column, bitmap=None, ascending=True):
+        """位图选中的行号，按范围筛选列的取值排序（缺失值始终排在最后）
+
+        直接复用构建索引时的排序结果，只需一次向量化过滤，不再对筛选结果排序。
+        """
+        values, order = self._sorted[column]
+        if not ascending:
+            # argsort 将 NaN 排在末尾，降序时只翻转非缺失部分
+            valid = self._valid[column]
+            order = np.concatenate([order[:valid][::-1], order[valid:]])
+        if bitmap is None:
+            return order
+        selected = np.unpackbits(bitmap, count=self.size).view(bool)
+        return order[selected[order]]
+
+    def values(self, column, bitmap=None):
+        """位图选中行在取值筛选列上出现过的取值（已排序，不含缺失值）"""
+        uniques = self._uniques[column]
+        if bitmap is None:
+            return list(uniques)
+        codes = self._codes[column][self.rows(bitmap)]
+        present = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+        return list(uniques[present])
+
+    @staticmethod
+    def intersect(*bitmaps):
+        """位图按位与，None 表示不限制"""
+        result = None
+        for bitmap in bitmaps:
+            if bitmap is None:
+                continue
+            result = bitmap if result is None else np.bitwise_and(result, bitmap)
+        return result
+
+    def rows(self, bitmap):
+        """位图选中的行号（升序），None 表示全部行"""
+        if bitmap is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from ratings_data import (BASE_FIELDS, SCHEDULE_FIELDS, RATINGS_NDJSON, RATINGS_STORE,
+                          RecordWriter, load_ratings_meta)
+from rating_scores import SCORE_CHUNKSIZE, draw_score_matrices, iter_rating_fields, score_columns
+
+# 用于合成姓名的常见姓氏与名字用字，组合用尽后追加编号
+SURNAMES = list("王李张刘陈杨赵黄周吴徐孙胡朱高林何郭马罗梁宋郑谢韩唐冯于董萧程曹袁邓许傅沈曾彭吕苏卢蒋蔡贾丁魏薛叶阎余潘杜戴夏钟汪田任姜范方石姚谭廖邹熊金陆郝孔白崔康毛邱秦江史顾侯邵孟龙万段雷钱汤尹黎易常武乔贺赖龚文")
+GIVEN_NAMES = ["伟", "芳", "娜", "敏", "静", "丽", "强", "磊", "军", "洋", "勇", "艳", "杰", "娟", "涛", "明", "超", "秀英", "霞", "平",
+               "刚", "桂英", "玉兰", "萍", "鹏", "辉", "玲", "建华", "晨", "欣怡", "子轩", "浩然", "雨涵", "宇航", "思远", "嘉怡"]
+
+LEVELS = ['本科一年级', '本科二年级', '本科三年级', '本科四年级', '研究生']
+DIFFICULTIES = ['入门', '中级', '高级']
+
+def synthetic_name(index):
+    """第 index 个合成姓名，姓氏与名字组合用尽后追加编号保证唯一"""
+    combos = len(SURNAMES) * len(GIVEN_NAMES)
+    name = SURNAMES[index % len(SURNAMES)] + GIVEN_NAMES[(index // len(SURNAMES)) % len(GIVEN_NAMES)]
+    return name if index < combos else f"{name}{index // combos + 1}"
+
+def build_courses(departments, courses_per_department, base_courses):
+    """课程表：优先沿用现有课程及其学科，学科数超出时补充合成学科与课程（None 表示沿用全部现有学科）"""
+    existing = list(dict.fromkeys(course['Department'] for course in base_courses))
+    if departments is None:
+        departments = len(existing)
+    courses = [course for course in base_courses if course['Department'] in existing[:departments]]
+    for d in range(len(existing), departments):
+        department = f"学科{d + 1:03d}"
+        for k in range(courses_per_department):
+            courses.append({
+                'Course Code': f"D{d + 1:03d}C{k + 1:02d}",
+                'Course Title': f"{department}专题 {k + 1}",
+                'Description': f"{department}方向的合成课程，用于压力测试。",
+                'Level': LEVELS[k % len(LEVELS)],
+                'Department': department,
+                'Difficulty': DIFFICULTIES[k % len(DIFFICULTIES)]
+            })
+    return courses
+
+def build_teachers(num_teachers, courses, rng):
+    """教师表：每位教师随机 1-3 个专业领域，只教授本专业领域内的 1-5 门课程"""
+    departments = list(dict.fromkeys(course['Department'] for course in courses))
+    department_courses = {dept: [c['Course Code'] for c in courses if c['Department'] == dept] for dept in departments}
+    teachers = []
+    for i in range(num_teachers):
+        expertise = list(rng.choice(departments, size=min(len(departments), int(rng.integers(1, 4))), replace=False))
+        possible_courses = [code for dept in expertise for code in department_courses[dept]]
+        taught = list(rng.choice(possible_courses, size=min(len(possible_courses), int(rng.integers(1, 6))), replace=False))
+        teachers.append({
+            'Teacher ID': f"T{i + 1:0{max(3, len(str(num_teachers)))}d}",
+            'Expertise': [str(dept) for dept in expertise],
+            'Courses Taught': [str(code) for code in taught],
+            'Teacher Name': synthetic_name(i)
+        })
+    return teachers
+
+def build_students(num_students):
+    width = max(3, len(str(num_students)))
+    return [
+        {'Student ID': f"S{i + 1:0{width}d}", 'Student Name': synthetic_name(i)}
+        for i in range(num_students)
+    ]
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+# 随机数流编号：实体表（教师等）与各会话分片分别由根种子派生独立的子种子
+ENTITY_STREAM = 0
+SHARD_STREAM = 1
+
+def stream_rng(root_seed, *key):
+    """由根种子与计数器派生的随机数生成器，同一 (根种子, key) 总是得到相同的随机序列"""
+    return np.random.default_rng(np.random.SeedSequence(root_seed, spawn_key=key))
+
+def session_context(teachers, students, ratings_meta, start_date, days, num_sessions):
+    """各分片共用的生成参数：ID 列表、教师可授课程的 CSR 结构、日期与时刻字符串表、评分权重与细则"""
+    course_codes = sorted({code for t in teachers for code in t['Courses Taught']})
+    course_index = {code: i for i, code in enumerate(course_codes)}
+    # 教师可授课程的 CSR 结构：teacher_courses[offsets[t]:offsets[t+1]]
+    counts = np.array([len(t['Courses Taught']) for t in teachers])
+    return {
+        'teacher_ids': [t['Teacher ID'] for t in teachers],
+        'student_ids': [s['Student ID'] for s in students],
+        'course_codes': course_codes,
+        'counts': counts,
+        'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'teacher_courses': np.array([course_index[code] for t in teachers for code in t['Courses Taught']]),
+        'dates': np.array(pd.date_range(start_date, periods=days).strftime('%Y-%m-%d'), dtype=object),
+        'clock': np.array([f"{m // 60 % 24:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object),
+        'width': max(6, len(str(num_sessions))),
+        'weights': {cat: info['weight'] for cat, info in ratings_meta.items()},
+        'criteria': {cat: list(info['criteria']) for cat, info in ratings_meta.items()}
+    }
+
+def generate_shard(context, rng, start, n):
+    """生成会话 start+1 ~ start+n，返回列式宽表（列与 flatten_ratings_compact 一致，ID 列为分类编码）与评分矩阵
+
+    教师、学生、日期、时间与评分都以数组一次抽取。
+    """
+    teacher = rng.integers(len(context['teacher_ids']), size=n)
+    course = context['teacher_courses'][
+        context['offsets'][teacher] + (rng.random(n) * context['counts'][teacher]).astype(np.int64)
+    ]
+    student = rng.integers(len(context['student_ids']), size=n)
+    # 上课时间：8:00-20:45 之间按刻钟开始，时长 90-180 分钟
+    start_minutes = rng.integers(8, 21, size=n) * 60 + rng.integers(0, 4, size=n) * 15
+    duration = rng.integers(90, 181, size=n)
+    clock = context['clock']
+    width = context['width']
+
+    columns = {
+        'session_id': np.array([f"EZ{i + 1:0{width}d}" for i in range(start, start + n)], dtype=object),
+        'student_id': pd.Categorical.from_codes(student, categories=context['student_ids']),
+        'teacher_id': pd.Categorical.from_codes(teacher, categories=context['teacher_ids']),
+        'course_code': pd.Categorical.from_codes(course, categories=context['course_codes']),
+        'schedule_start_date': context['dates'][rng.integers(len(context['dates']), size=n)],
+        'schedule_start_time': clock[start_minutes],
+        'schedule_end_time': clock[(start_minutes + duration) % (24 * 60)],
+        'schedule_duration_minutes': duration.astype(np.int64),
+    }
+    matrices = draw_score_matrices(n, rng, context['weights'], context['criteria'])
+    columns.update(score_columns(context['criteria'], *matrices))
+    return pd.DataFrame(columns, copy=False), matrices
+
+def frame_records(frame, criteria, matrices):
+    """将一块会话转换为紧凑格式记录，用于写出 NDJSON"""
+    base = {field: frame[field].astype(object).tolist() for field in BASE_FIELDS}
+    schedule_fields = {field: frame[f'schedule_{field}'].tolist() for field in SCHEDULE_FIELDS}
+    for i, rating in enumerate(iter_rating_fields(criteria, *matrices)):
+        record = {field: values[i] for field, values in base.items()}
+        record['schedule'] = {field: values[i] for field, values in schedule_fields.items()}
+        record['ratings'] = rating
+        yield record
+
+def shard_path(shard_dir, shard, extension):
+    return os.path.join(shard_dir, f'shard-{shard:06d}.{extension}')
+
+# 工作进程中的生成参数，由进程池初始化时传入一次，避免每个分片重复序列化
+_shard_context = None
+
+def _init_shard_worker(context):
+    global _shard_context
+    _shard_context = context
+
+def write_shard(job):
+    """在工作进程中生成一个分片并写为独立的分段文件，返回会话数
+
+    分片的随机序列只由根种子与分片序号决定，与工作进程数量及调度顺序无关。
+    分片内按 SCORE_CHUNKSIZE 分块生成与写出（Parquet 每块一个 row group），内存占用与分片大小无关。
+    """
+    shard, start, n = job
+    context = _shard_context
+    rng = stream_rng(context['seed'], SHARD_STREAM, shard)
+    ndjson = RecordWriter(shard_path(context['shard_dir'], shard, 'ndjson'), ndjson=True) \
+        if 'ndjson' in context['formats'] else None
+    parquet = None
+    if 'parquet' in context['formats']:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    try:
+        for offset in range(0, n, SCORE_CHUNKSIZE):
+            frame, matrices = generate_shard(context, rng, start + offset, min(SCORE_CHUNKSIZE, n - offset))
+            if ndjson is not None:
+                for record in frame_records(frame, context['criteria'], matrices):
+                    ndjson.write(record)
+            if 'parquet' in context['formats']:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if parquet is None:
+                    parquet = pq.ParquetWriter(shard_path(context['shard_dir'], shard, 'parquet'), table.schema,
+                                               compression='zstd')
+                parquet.write_table(table, row_group_size=len(table))
+    except BaseException:
+        # 出错时丢弃未写完的分段，不留下残缺文件
+        if ndjson is not None:
+            ndjson.abort()
+        raise
+    else:
+        if ndjson is not None:
+            ndjson.close()
+    finally:
+        if parquet is not None:
+            parquet.close()
+    return n
+
+def merge_shards(shard_dir, num_shards, output_dir, formats):
+    """按分片序号依次合并分段文件：NDJSON 直接拼接，Parquet 沿用分片中的 row group"""
+    if 'ndjson' in formats:
+        with open(os.path.join(output_dir, RATINGS_NDJSON), 'wb') as out:
+            for shard in range(num_shards):
+                with open(shard_path(shard_dir, shard, 'ndjson'), 'rb') as f:
+                    shutil.copyfileobj(f, out)
+    if 'parquet' in formats:
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for shard in range(num_shards):
+                # 各分片的分类取值相同，字典编码的列类型一致；逐个 row group 拷贝，不整体读入分片
+                shard_file = pq.ParquetFile(shard_path(shard_dir, shard, 'parquet'))
+                for group in range(shard_file.num_row_groups):
+                    table = shard_file.read_row_group(group)
+                    if writer is None:
+                        writer = pq.ParquetWriter(os.path.join(output_dir, RATINGS_STORE), table.schema,
+                                                  compression='zstd')
+                    writer.write_table(table, row_group_size=max(1, len(table)))
+        finally:
+            if writer is not None:
+                writer.close()
+    shutil.rmtree(shard_dir)
+
+def generate_load_dataset(num_sessions, num_students, num_teachers, departments, courses_per_department,
+                          start_date, days, output_dir, output_format, shard_size, seed=None, workers=None,
+                          meta_path='ratings_meta.json', courses_path='courses.json'):
+    """分片并行生成数据集，返回 (会话数, 根种子)
+
+    会话按固定大小 shard_size 切分为分片，各分片由进程池并行生成并写为独立的分段文件，
+    最后按序合并。分片划分与各分片的种子都不依赖工作进程数，相同根种子得到逐字节相同的输出。
+    """
+    # 未指定种子时取一个随机根种子并返回，便于复现本次结果
+    seed = np.random.SeedSequence(seed).entropy
+    os.makedirs(output_dir, exist_ok=True)
+
+    ratings_meta = load_ratings_meta(meta_path)
+    with open(courses_path, 'r', encoding='utf-8') as f:
+        base_courses = json.load(f)
+    courses = build_courses(departments, courses_per_department, base_courses)
+    teachers = build_teachers(num_teachers, courses, stream_rng(seed, ENTITY_STREAM))
+    students = build_students(num_students)
+
+    write_json(os.path.join(output_dir, 'ratings_meta.json'), ratings_meta)
+    write_json(os.path.join(output_dir, 'courses.json'), courses)
+    write_json(os.path.join(output_dir, 'teachers.json'), teachers)
+    write_json(os.path.join(output_dir, 'students.json'), students)
+
+    shard_dir = os.path.join(output_dir, 'shards')
+    os.makedirs(shard_dir, exist_ok=True)
+    context = session_context(teachers, students, ratings_meta, start_date, days, num_sessions)
+    context.update(seed=seed, shard_dir=shard_dir,
+                   formats=['ndjson', 'parquet'] if output_format == 'both' else [output_format])
+    jobs = [
+        (shard, start, min(shard_size, num_sessions - start))
+        for shard, start in enumerate(range(0, num_sessions, shard_size))
+    ]
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_shard_worker, initargs=(context,)) as pool:
+        for n in pool.map(write_shard, jobs):
+            written += n
+            print(f"已生成 {written}/{num_sessions} 条会话", end='\r', flush=True)
+    print()
+    merge_shards(shard_dir, len(jobs), output_dir, context['formats'])
+    return written, seed
+
+def main():
+    parser = argparse.ArgumentParser(description="生成用于压力测试的合成课程评分数据集")
+    parser.add_argument('--sessions', type=int, default=100_000, help="会话数，如 10000/100000/1000000/10000000")
+    parser.add_argument('--students', type=int, help="学生数（默认为会话数的 1/10，至少 100）")
+    parser.add_argument('--teachers', type=int, help="教师数（默认为会话数的 1/1000，至少 40）")
+    parser.add_argument('--departments', type=int, help="学科数（默认沿用现有学科），超出现有学科时补充合成学科")
+    parser.add_argument('--courses-per-department', type=int, default=4, help="每个合成学科的课程数")
+    parser.add_argument('--start-date', default='2024-01-01', help="最早上课日期")
+    parser.add_argument('--days', type=int, default=181, help="上课日期跨度（天）")
+    parser.add_argument('--output-dir', default='load_data', help="输出目录")
+    parser.add_argument('--format', choices=['parquet', 'ndjson', 'both'], default='parquet',
+                        help="评分输出格式：列式存储（看板直接读取）、NDJSON，或两者")
+    parser.add_argument('--shard-size', type=int, default=100_000,
+                        help="每个分片的会话数（分片划分决定输出，与工作进程数无关）")
+    parser.add_argument('--workers', type=int, help="工作进程数，默认为 CPU 核数")
+    parser.add_argument('--seed', type=int, help="根随机种子，指定后结果可复现")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written, seed = generate_load_dataset(
+        num_sessions=args.sessions,
+        num_students=args.students or max(100, args.sessions // 10),
+        num_teachers=args.teachers or max(40, args.sessions // 1000),
+        departments=args.departments,
+        courses_per_department=args.courses_per_department,
+        start_date=args.start_date,
+        days=args.days,
+        output_dir=args.output_dir,
+        output_format=args.format,
+        shard_size=args.shard_size,
+        seed=args.seed,
+        workers=args.workers
+    )
+    print(f"已生成 {written} 条会话到 {args.output_dir}（种子 {seed}），耗时 {time.perf_counter() - start:.1f} 秒")
+
+if __name__ == "__main__":
+    main()
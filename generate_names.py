@@ -1,5 +1,9 @@
+import argparse
+import itertools
 import json
+import math
 import random
+from ratings_data import iter_records, write_records
 
 # 常用英文名和拼音姓氏
 english_first_names = [
@@ -12,11 +16,25 @@ pinyin_surnames = [
     "Xu", "Sun", "Hu", "Zhu", "Gao", "Lin", "He", "Guo", "Ma", "Luo"
 ]
 
-def random_english_chinese_name(used):
-    while True:
-        name = random.choice(english_first_names) + ' ' + random.choice(pinyin_surnames)
-        if name not in used:
-            return name
+def english_chinese_names(rng=random):
+    """依次生成互不重复的 英文名+拼音姓氏，每个名字 O(1)
+
+    组合空间按随机仿射置换 i -> (a*i + b) mod N 遍历（a 与 N 互素，不重不漏），
+    全部组合用尽后追加编号 2、3…… 再遍历一轮。
+    """
+    size = len(english_first_names) * len(pinyin_surnames)
+    a = rng.choice([k for k in range(1, size) if math.gcd(k, size) == 1])
+    b = rng.randrange(size)
+    for round_number in itertools.count(1):
+        suffix = '' if round_number == 1 else f' {round_number}'
+        for i in range(size):
+            first, surname = divmod((a * i + b) % size, len(pinyin_surnames))
+            yield f"{english_first_names[first]} {pinyin_surnames[surname]}{suffix}"
+
+parser = argparse.ArgumentParser(description="为学生分配互不重复的英文名+拼音姓氏")
+parser.add_argument('--seed', type=int, help="随机种子，指定后结果可复现")
+args = parser.parse_args()
+random.seed(args.seed)
 
 # 教师
 with open('teachers.json', 'r', encoding='utf-8') as f:
@@ -25,14 +43,11 @@ with open('teachers.json', 'r', encoding='utf-8') as f:
 with open('teachers.json', 'w', encoding='utf-8') as f:
     json.dump(teachers, f, ensure_ascii=False, indent=4)
 
-# 学生
-with open('students.json', 'r', encoding='utf-8') as f:
-    students = json.load(f)
-used_names = set()
-for s in students:
-    name = random_english_chinese_name(used_names)
-    s['Student Name'] = name
-    used_names.add(name)
-with open('students.json', 'w', encoding='utf-8') as f:
-    json.dump(students, f, ensure_ascii=False, indent=4)
-print('已为所有学生分配英文+拼音姓氏名字') 
\ No newline at end of file
+# 学生：读取、命名、写出在同一遍中逐条完成（write_records 先写临时文件再替换）
+def iter_named_students(students, names):
+    for s in students:
+        s['Student Name'] = next(names)
+        yield s
+
+total = write_records(iter_named_students(iter_records('students.json'), english_chinese_names()), 'students.json')
+print(f'已为所有 {total} 名学生分配英文+拼音姓氏名字') 
\ No newline at end of file
@@ -0,0 +1,26 @@
+import argparse
+from ratings_data import (
+    load_ratings_meta, iter_records, append_segment, list_segments, compact_ratings_log, RATINGS_LOG_DIR
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="增量写入新增评分会话，并定期合并进列式存储")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    append_parser = subparsers.add_parser('append', help="将新增会话（JSON 数组或 NDJSON）写为追加日志的新分段")
+    append_parser.add_argument('path')
+    append_parser.add_argument('--log-dir', default=RATINGS_LOG_DIR)
+
+    compact_parser = subparsers.add_parser('compact', help="将全部分段合并进原始评分数据与列式存储并清空追加日志")
+    compact_parser.add_argument('--log-dir', default=RATINGS_LOG_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'append':
+        segment = append_segment(iter_records(args.path), args.log_dir)
+        print(f"已写入分段 {segment}，当前共{len(list_segments(args.log_dir))}个待合并分段")
+    else:
+        merged = compact_ratings_log(load_ratings_meta(), args.log_dir)
+        print(f"已合并{merged}个分段到原始评分数据与列式存储")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from filter_index import to_day_numbers
+from ratings_data import widen_scores
+
+# 聚合立方体的维度：日期 × 教师 × 课程 × 业务分类（教师姓名随教师ID确定，一并作为维度保留）
+CUBE_DIMENSIONS = ['schedule_start_date', 'teacher_id', 'Teacher Name', 'course_code', 'Business Category']
+
+class RatingCube:
+    """评分聚合立方体
+
+    cells 中每个维度组合一行，保存会话数 count，以及每个评分指标的
+    {指标}_sum、{指标}_sumsq、{指标}_count（非空个数），任意维度上的均值、
+    标准差都可由这些可加量上卷得到，无需回到原始会话。
+    students 记录每个维度组合出现过的学生，用于上卷去重后的选课人数。
+    """
+
+    def __init__(self, cells, students, measures):
+        self.cells = cells
+        self.students = students
+        self.measures = measures
+
+    @classmethod
+    def from_frame(cls, df, measures, students=True):
+        """由会话宽表构建立方体，维度组合按首次出现的顺序排列
+
+        students 为 False 时不生成学生表（只需要 cells 上卷的场景，如静态导出）。
+        """
+        frame = pd.DataFrame({dim: df[dim].to_numpy() for dim in CUBE_DIMENSIONS})
+        frame['count'] = 1
+        for measure in measures:
+            values = widen_scores(df[measure].to_numpy())
+            valid = ~np.isnan(values)
+            frame[f'{measure}_sum'] = np.where(valid, values, 0.0)
+            frame[f'{measure}_sumsq'] = np.where(valid, values * values, 0.0)
+            frame[f'{measure}_count'] = valid.astype(np.int64)
+        cells = frame.groupby(CUBE_DIMENSIONS, dropna=False, sort=False, observed=True).sum().reset_index()
+        cells['schedule_day'] = to_day_numbers(cells['schedule_start_date'])
+        if not students:
+            return cls(cells, None, measures)
+
+        students = df[CUBE_DIMENSIONS + ['student_id']].drop_duplicates().reset_index(drop=True)
+        students['schedule_day'] = to_day_numbers(students['schedule_start_date'])
+        return cls(cells, students, measures)
+
+    @staticmethod
+    def _mask(frame, day_range, category, course, teacher):
+        mask = np.ones(len(frame), dtype=bool)
+        if day_range is not None:
+            days = frame['schedule_day'].to_numpy()
+            mask &= (days >= day_range[0]) & (days <= day_range[1])
+        if category is not None:
+            mask &= (frame['Business Category'] == category).to_numpy()
+        if course is not None:
+            mask &= (frame['course_code'] == course).to_numpy()
+        if teacher is not None:
+            mask &= (frame['Teacher Name'] == teacher).to_numpy()
+        return mask
+
+    def select(self, day_range=None, category=None, course=None, teacher=None):
+        """按立方体维度上的筛选条件切片，None 表示不限制"""
+        return RatingCube(
+            self.cells[self._mask(self.cells, day_range, category, course, teacher)],
+            self.students[self._mask(self.students, day_range, category, course, teacher)],
+            self.measures
+        )
+
+    def _finalize(self, sums, measures):
+        for measure in measures:
+            count = sums[f'{measure}_count']
+            mean = sums[f'{measure}_sum'] / count.where(count > 0)
+            variance = (sums[f'{measure}_sumsq'] / count.where(count > 0) - mean ** 2).clip(lower=0)
+            sums[measure] = mean
+            sums[f'{measure}_std'] = np.sqrt(variance)
+        return sums
+
+    def rollup(self, by, measures=None, first=None):
+        """按 by 上卷，返回每组的会话数 count 以及各指标的均值 {指标}、标准差 {指标}_std、非空个数 {指标}_count
+
+        first 中的列取每组第一个维度组合上的值（与在原始会话上 groupby().first() 一致）。
+        """
+        measures = self.measures if measures is None else measures
+        columns = ['count']
+        for measure in measures:
+            columns += [f'{measure}_sum', f'{measure}_sumsq', f'{measure}_count']
+        grouped = self.cells.groupby(by, observed=True)
+        sums = grouped[columns].sum()
+        if first:
+            sums = sums.join(grouped[first].first())
+        return self._finalize(sums, measures).reset_index()
+
+    def means(self, measures=None):
+        """全部维度组合上各指标的均值"""
+        measures = self.measures if measures is None else measures
+        return pd.Series({
+            measure: self.cells[f'{measure}_sum'].sum() / self.cells[f'{measure}_count'].sum()
+            for measure in measures
+        })
+
+    def distinct_students(self, by):
+        """按 by 上卷去重后的学生人数"""
+        return self.students.drop_duplicates(by + ['student_id']).groupby(by, observed=True).size()
+
+    def teacher_profiles(self):
+        """教师画像表：以 teacher_id 为索引，包含总课时 count、平均总分、各维度均分，
+        以及按首次出现顺序排列的历史课程列表 courses"""
+        profiles = self.rollup('teacher_id').set_index('teacher_id')
+        profiles['courses'] = (
+            self.cells.drop_duplicates(['teacher_id', 'course_code'])
+            .groupby('teacher_id', sort=False)['course_code'].agg(list)
+        )
+        return profiles
@@ -3,9 +3,18 @@ import pandas as pd
 import json
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
 import hashlib
 import re
+import os
+import tempfile
+from ratings_data import (
+    load_ratings_meta, load_ratings_frame, load_segment_frame, enrich_ratings_frame, list_segments,
+    list_compacting_segments, drop_compacted, widen_scores, widen_score_columns,
+    BASE_FIELDS, RATINGS_JSON, RATINGS_NDJSON, RATINGS_STORE
+)
+from filter_index import FilterIndex, to_day_numbers, day_number, from_day_number
+from rating_cube import RatingCube
+from ratings_export import EXPORT_FORMATS, write_export
 
 # 设置页面配置
 st.set_page_config(
@@ -20,69 +29,118 @@ def get_avatar_url(name):
     return f"https://api.dicebear.com/7.x/micah/svg?seed={seed}"
 
 # 加载评分元数据
-with open('ratings_meta.json', 'r', encoding='utf-8') as f:
-    ratings_meta = json.load(f)
-
-# 加载数据
-@st.cache_data
-def load_data():
-    with open('course_ratings_compact.json', 'r', encoding='utf-8') as f:
-        ratings_compact = json.load(f)
+ratings_meta = load_ratings_meta()
+
+# 评分宽表依赖的数据文件（列式存储、NDJSON 可选，不存在时回退到 JSON）
+RATINGS_FILES = [
+    'ratings_meta.json',
+    RATINGS_JSON,
+    RATINGS_NDJSON,
+    RATINGS_STORE
+]
+REFERENCE_FILES = [
+    'teachers.json',
+    'students.json',
+    'courses.json'
+]
+
+def get_files_version(files):
+    """以文件的修改时间作为数据版本号，任一文件更新后缓存自动失效"""
+    return tuple(os.path.getmtime(file) if os.path.exists(file) else None for file in files)
+
+def get_data_version():
+    """数据版本：基础评分数据、教师/学生/课程信息，以及追加日志中每个分段（含合并中的分段）的修改时间"""
+    compacting = tuple((path, os.path.getmtime(path)) for path in list_compacting_segments())
+    segments = tuple((path, os.path.getmtime(path)) for path in list_segments())
+    return get_files_version(RATINGS_FILES), get_files_version(REFERENCE_FILES), compacting, segments
+
+# 看板只用到维度分，细则分列不读取
+DASHBOARD_COLUMNS = BASE_FIELDS + ['schedule_start_date', 'total_score'] + [f'{cat}_score' for cat in ratings_meta]
+
+# 以下各阶段每个数据版本只构建一次，并在所有会话间共享（只读使用，不要原地修改）
+@st.cache_resource(max_entries=1)
+def load_reference_data(reference_version):
     with open('teachers.json', 'r', encoding='utf-8') as f:
-        teachers = json.load(f)
-    return ratings_compact, teachers
-
-ratings_compact, teachers_data = load_data()
-
-# 将数据转换为DataFrame
-# 解析评分细则索引为列
-
-def flatten_ratings_compact(ratings):
-    flattened_data = []
-    for rating in ratings:
-        base_data = {
-            'session_id': rating['session_id'],
-            'student_id': rating['student_id'],
-            'teacher_id': rating['teacher_id'],
-            'course_code': rating['course_code'],
-            'schedule': rating['schedule'],
-            'total_score': rating['ratings']['total_score'],
+        teachers_data = json.load(f)
+    teachers_df = pd.DataFrame(teachers_data)
+    students_df = pd.read_json('students.json')
+    courses_df = pd.read_json('courses.json')
+    return teachers_df, students_df, courses_df
+
+# 基础数据：按列读取展开后的评分宽表，合并教师/学生/课程信息
+@st.cache_resource(max_entries=1, show_spinner="正在加载评分数据...")
+def load_base_dataset(ratings_version, reference_version):
+    df = load_ratings_frame(ratings_meta, columns=DASHBOARD_COLUMNS)
+    return enrich_ratings_frame(df, *load_reference_data(reference_version))
+
+# 追加分段：新分段只展开、合并自身，已有分段和基础数据直接复用缓存
+@st.cache_resource(max_entries=256)
+def load_segment_dataset(segment_path, segment_mtime, reference_version):
+    df = load_segment_frame(segment_path, ratings_meta, columns=DASHBOARD_COLUMNS)
+    return enrich_ratings_frame(df, *load_reference_data(reference_version))
+
+# 准备数据集：基础数据与各追加分段拼接为完整宽表
+@st.cache_resource(max_entries=1)
+def load_prepared_dataset(data_version):
+    ratings_version, reference_version, compacting, segments = data_version
+    frames = [load_base_dataset(ratings_version, reference_version)]
+    # 合并中断时留下的分段只取原始数据中还没有的会话
+    frames.extend(drop_compacted(load_segment_dataset(path, mtime, reference_version), frames[0])
+                  for path, mtime in compacting)
+    frames.extend(load_segment_dataset(path, mtime, reference_version) for path, mtime in segments)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    teachers_df, students_df, _ = load_reference_data(reference_version)
+    # 学生筛选器使用全部学生名单
+    all_student_names = sorted(students_df['Student Name'].unique())
+    return df, teachers_df, all_student_names
+
+# 总分与各维度分
+SCORE_MEASURES = ['total_score'] + [f'{cat}_score' for cat in ratings_meta]
+
+# 筛选索引：每个数据版本构建一次，侧边栏筛选均通过位图求交完成
+@st.cache_resource(max_entries=1)
+def load_filter_index(data_version):
+    df = load_prepared_dataset(data_version)[0]
+    return FilterIndex(
+        df,
+        value_columns=['Business Category', 'course_code', 'Teacher Name', 'Student Name'],
+        range_columns={
+            'schedule_day': to_day_numbers(df['schedule_start_date']),
+            # 总分用于范围筛选，各评分列的排序结果同时用于明细表的服务端排序
+            **{col: widen_scores(df[col]) for col in SCORE_MEASURES}
         }
-        # 展开各维度分
-        for cat, cat_info in rating['ratings']['ratings'].items():
-            base_data[f'{cat}_score'] = cat_info['score']
-            # 展开细则分
-            for cidx, score in cat_info['criteria'].items():
-                base_data[f'{cat}_{cidx}'] = score
-        flattened_data.append(base_data)
-    return pd.DataFrame(flattened_data)
-
-df = flatten_ratings_compact(ratings_compact)
-
-# 合并教师信息
-teachers_df = pd.DataFrame(teachers_data)
-df = df.merge(teachers_df[['Teacher ID', 'Expertise', 'Teacher Name']], 
-              left_on='teacher_id', 
-              right_on='Teacher ID', 
-              how='left')
-# 合并学生信息
-students_df = pd.read_json('students.json')
-df = df.merge(students_df[['Student ID', 'Student Name']],
-              left_on='student_id',
-              right_on='Student ID',
-              how='left')
-# 合并课程信息，添加Department字段（唯一业务分类）
-courses_df = pd.read_json('courses.json')
-df = df.merge(courses_df[['Course Code', 'Department']],
-              left_on='course_code',
-              right_on='Course Code',
-              how='left')
-df = df.rename(columns={'Department': 'Business Category'})
-
-# 解析schedule为多列
-schedule_df = pd.json_normalize(df['schedule'])
-schedule_df.columns = [f'schedule_{col}' for col in schedule_df.columns]
-df = pd.concat([df.drop(columns=['schedule']), schedule_df], axis=1)
+    )
+
+# 评分聚合立方体：所有图表的分组统计均由立方体上卷得到
+@st.cache_resource(max_entries=1)
+def load_rating_cube(data_version):
+    return RatingCube.from_frame(load_prepared_dataset(data_version)[0], SCORE_MEASURES)
+
+# 教师画像：每个数据版本计算一次，教师详情按 teacher_id 直接查表
+@st.cache_resource(max_entries=1)
+def load_teacher_profiles(data_version):
+    teachers_df = load_prepared_dataset(data_version)[1]
+    profiles = load_rating_cube(data_version).teacher_profiles()
+    return profiles.join(teachers_df.set_index('Teacher ID')[['Teacher Name', 'Expertise']])
+
+# 商业分析模块的图表不受筛选影响，上卷结果与选课人数每个数据版本计算一次
+@st.cache_resource(max_entries=1)
+def load_overview_rollups(data_version):
+    cube = load_rating_cube(data_version)
+    return {
+        'teacher_scores': cube.rollup('Teacher Name', ['total_score'], first=['Business Category']),
+        'teacher_trend': cube.rollup(['schedule_start_date', 'Teacher Name'], ['total_score']),
+        'course_scores': cube.rollup('course_code', ['total_score']),
+        'course_popularity': cube.distinct_students(['course_code']).reset_index(name='选课人数'),
+    }
+
+data_version = get_data_version()
+df, teachers_df, all_student_names = load_prepared_dataset(data_version)
+filter_index = load_filter_index(data_version)
+rating_cube = load_rating_cube(data_version)
+teacher_profiles = load_teacher_profiles(data_version)
+overview_rollups = load_overview_rollups(data_version)
 
 # 页面标题
 st.title("📊 课程评分分析看板")
@@ -91,8 +149,8 @@ st.title("📊 课程评分分析看板")
 st.sidebar.header("🔍 筛选条件")
 
 # 日期范围筛选
-min_date = datetime.strptime(df['schedule_start_date'].min(), '%Y-%m-%d')
-max_date = datetime.strptime(df['schedule_start_date'].max(), '%Y-%m-%d')
+min_date = from_day_number(filter_index.min('schedule_day'))
+max_date = from_day_number(filter_index.max('schedule_day'))
 
 date_range = st.sidebar.date_input(
     "选择日期范围",
@@ -101,80 +159,92 @@ date_range = st.sidebar.date_input(
     max_value=max_date
 )
 
-filtered_df = df.copy()
+# 各筛选条件对应一个行位图，组合筛选即位图求交（None 表示不限制）
+selection = None
 if len(date_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df['schedule_start_date'] >= date_range[0].strftime('%Y-%m-%d')) &
-        (filtered_df['schedule_start_date'] <= date_range[1].strftime('%Y-%m-%d'))
-    ]
+    selection = filter_index.between('schedule_day', day_number(date_range[0]), day_number(date_range[1]))
 
 # 教师业务分类筛选
-available_categories = sorted(df['Business Category'].dropna().unique())
+available_categories = filter_index.values('Business Category')
 selected_category = st.sidebar.selectbox(
     "选择业务分类（课程所属学科）",
     options=["全部"] + available_categories,
     index=0
 )
 if selected_category != "全部":
-    filtered_df = filtered_df[filtered_df['Business Category'] == selected_category]
+    selection = filter_index.intersect(selection, filter_index.equals('Business Category', selected_category))
 
 # 课程代码筛选
-available_courses = sorted(filtered_df['course_code'].unique())
+available_courses = filter_index.values('course_code', selection)
 selected_course = st.sidebar.selectbox(
     "选择课程",
     options=["全部"] + available_courses,
     index=0
 )
 if selected_course != "全部":
-    filtered_df = filtered_df[filtered_df['course_code'] == selected_course]
+    selection = filter_index.intersect(selection, filter_index.equals('course_code', selected_course))
 
 # 教师筛选
-available_teachers = sorted(filtered_df['Teacher Name'].unique())
+available_teachers = filter_index.values('Teacher Name', selection)
 selected_teacher = st.sidebar.selectbox(
     "选择教师",
     options=["全部"] + available_teachers,
     index=0
 )
 if selected_teacher != "全部":
-    filtered_df = filtered_df[filtered_df['Teacher Name'] == selected_teacher]
+    selection = filter_index.intersect(selection, filter_index.equals('Teacher Name', selected_teacher))
 
 # 学生筛选
-students_df_for_filter = pd.read_json('students.json')
-all_student_names = sorted(students_df_for_filter['Student Name'].unique())
 selected_student = st.sidebar.selectbox(
     "选择学生",
     options=["全部"] + all_student_names,
     index=0
 )
 if selected_student != "全部":
-    filtered_df = filtered_df[filtered_df['Student Name'] == selected_student]
+    selection = filter_index.intersect(selection, filter_index.equals('Student Name', selected_student))
 
 # 分数范围筛选
-if not filtered_df.empty:
-    min_score = float(filtered_df['total_score'].min())
-    max_score = float(filtered_df['total_score'].max())
-    if min_score > max_score:
-        min_score = max_score
+if selection is None:
+    min_score = float(filter_index.min('total_score'))
+    max_score = float(filter_index.max('total_score'))
 else:
-    min_score = 0.0
-    max_score = 10.0
+    selected_scores = filter_index.column_values('total_score', selection)
+    # 与 pandas 的 min()/max() 一致，跳过缺失的总分
+    selected_scores = selected_scores[~pd.isna(selected_scores)]
+    if len(selected_scores) > 0:
+        min_score = float(selected_scores.min())
+        max_score = float(selected_scores.max())
+    else:
+        min_score = 0.0
+        max_score = 10.0
 score_range = st.sidebar.slider(
     "选择总分范围",
     min_value=min_score,
     max_value=max_score,
     value=(min_score, max_score)  # 默认全范围
 )
-if not filtered_df.empty:
-    filtered_df = filtered_df[
-        (filtered_df['total_score'] >= score_range[0]) &
-        (filtered_df['total_score'] <= score_range[1])
-    ]
+selection = filter_index.intersect(selection, filter_index.between('total_score', score_range[0], score_range[1]))
+
+filtered_rows = filter_index.rows(selection)
+filtered_df = df.iloc[filtered_rows] if selection is not None else df
 
 # 在所有筛选器之后，检查 filtered_df 是否为空
 if filtered_df.empty:
     st.warning("⚠️ 没有找到符合筛选条件的数据。请调整筛选器。")
     st.stop() # 如果没有数据，停止执行后续代码
 
+# 日期、业务分类、课程、教师均为立方体维度，直接切片；
+# 学生和总分范围不在立方体维度内，启用时改由筛选后的会话构建立方体
+if selected_student != "全部" or score_range != (min_score, max_score):
+    filtered_cube = RatingCube.from_frame(filtered_df, SCORE_MEASURES)
+else:
+    filtered_cube = rating_cube.select(
+        day_range=(day_number(date_range[0]), day_number(date_range[1])) if len(date_range) == 2 else None,
+        category=selected_category if selected_category != "全部" else None,
+        course=selected_course if selected_course != "全部" else None,
+        teacher=selected_teacher if selected_teacher != "全部" else None
+    )
+
 # 修改为更合理的分栏比例，统计数据更宽，老师卡片更紧凑
 left_col, right_col = st.columns([5, 2], gap="medium")
 
@@ -207,8 +277,7 @@ with left_col:
 
 with right_col:
     selected_teachers_info = (
-        filtered_df.groupby('Teacher Name', as_index=False)
-        .agg({'Business Category': lambda x: x.iloc[0] if isinstance(x.iloc[0], list) else x, 'teacher_id': 'first'})
+        filtered_cube.rollup('Teacher Name', measures=[], first=['Business Category', 'teacher_id'])
         .head(5)
     )
     if not selected_teachers_info.empty:
@@ -232,18 +301,18 @@ with right_col:
                     st.session_state['selected_teacher_id'] = row['teacher_id']
 
 # 教师详细信息弹出区
-if 'selected_teacher_id' in st.session_state:
+if st.session_state.get('selected_teacher_id') in teacher_profiles.index:
     teacher_id = st.session_state['selected_teacher_id']
-    teacher_info = teachers_df[teachers_df['Teacher ID'] == teacher_id].iloc[0]
+    teacher_info = teacher_profiles.loc[teacher_id]
     teacher_name = teacher_info['Teacher Name']
     teacher_avatar = get_avatar_url(teacher_name)
     teacher_exp = ', '.join(teacher_info['Expertise']) if isinstance(teacher_info['Expertise'], list) else teacher_info['Expertise']
-    teacher_courses = df[df['teacher_id'] == teacher_id]['course_code'].unique().tolist()
-    total_sessions = len(df[df['teacher_id'] == teacher_id])
-    avg_score = df[df['teacher_id'] == teacher_id]['total_score'].mean()
+    teacher_courses = teacher_info['courses']
+    total_sessions = teacher_info['count']
+    avg_score = teacher_info['total_score']
     # 维度分数
     radar_cats = [cat for cat in ratings_meta.keys()]
-    radar_scores = [df[df['teacher_id'] == teacher_id][f'{cat}_score'].mean() for cat in radar_cats]
+    radar_scores = [teacher_info[f'{cat}_score'] for cat in radar_cats]
     radar_fig = go.Figure()
     radar_fig.add_trace(go.Scatterpolar(
         r=radar_scores + [radar_scores[0]],
@@ -271,8 +340,8 @@ if 'selected_teacher_id' in st.session_state:
 chart_col1, chart_col2 = st.columns(2)
 with chart_col1:
     st.subheader("📈 评分维度对比")
-    category_scores = filtered_df[[col for col in filtered_df.columns if col.endswith('_score')]]
-    category_scores = category_scores.mean().reset_index()
+    category_scores = filtered_cube.means([col for col in filtered_df.columns if col.endswith('_score')])
+    category_scores = category_scores.reset_index()
     category_scores.columns = ['Category', 'Score']
     category_scores['Category'] = category_scores['Category'].str.replace('_score', '')
     y_min = category_scores['Score'].min()
@@ -293,10 +362,11 @@ with chart_col2:
     y_min = filtered_df['total_score'].min()
     y_max = filtered_df['total_score'].max()
     y_margin = (y_max - y_min) * 0.15 if y_max > y_min else 1
-    unique_scores = sorted(filtered_df['total_score'].unique())
+    total_scores = pd.DataFrame({'total_score': widen_scores(filtered_df['total_score'])})
+    unique_scores = sorted(total_scores['total_score'].dropna().unique())
     nbins = max(len(unique_scores), 10)
     fig = px.histogram(
-        filtered_df,
+        total_scores,
         x='total_score',
         nbins=nbins,
         title="课程总分分布",
@@ -320,27 +390,56 @@ columns_to_show = [
 ]
 rating_columns = [col for col in df.columns if col.endswith('_score') and col not in columns_to_show]
 columns_to_show.extend(rating_columns)
+
+# 分页展示筛选结果：排序在服务端完成，只把当前页发送到浏览器
+sort_col, order_col, size_col, page_col = st.columns([3, 2, 2, 2])
+with sort_col:
+    sort_by = st.selectbox("排序字段", options=["默认顺序"] + SCORE_MEASURES)
+with order_col:
+    sort_ascending = st.radio("排序方式", options=["降序", "升序"], horizontal=True) == "升序"
+with size_col:
+    page_size = st.selectbox("每页行数", options=[20, 50, 100, 200], index=1)
+total_rows = len(filtered_df)
+total_pages = max((total_rows - 1) // page_size + 1, 1)
+with page_col:
+    page = st.number_input("页码", min_value=1, max_value=total_pages, value=1, step=1)
+
+if sort_by == "默认顺序":
+    ordered_rows = filtered_rows
+else:
+    ordered_rows = filter_index.sorted_rows(sort_by, selection, ascending=sort_ascending)
+page_rows = ordered_rows[(page - 1) * page_size:page * page_size]
 st.dataframe(
-    df[columns_to_show],
-    use_container_width=True
+    widen_score_columns(df.iloc[page_rows][columns_to_show]),
+    use_container_width=True,
+    hide_index=True
 )
-if st.button("导出全部数据"):
-    csv = df[columns_to_show].to_csv(index=False)
-    st.download_button(
-        label="下载CSV文件",
-        data=csv,
-        file_name="course_ratings_all.csv",
-        mime="text/csv"
-    )
+st.caption(f"共 {total_rows} 条，第 {page}/{total_pages} 页")
+# 导出筛选结果：点击后才分块写入临时文件，不在内存中拼接完整的导出内容
+export_col, format_col = st.columns([1, 3])
+with format_col:
+    export_format = st.radio("导出格式", options=list(EXPORT_FORMATS), horizontal=True)
+with export_col:
+    export_requested = st.button("导出筛选数据")
+if export_requested:
+    extension, mime = EXPORT_FORMATS[export_format]
+    with tempfile.TemporaryDirectory() as export_dir:
+        with st.spinner("正在生成导出文件..."):
+            export_path = write_export(df, ordered_rows, columns_to_show, export_format, export_dir, 'course_ratings')
+        with open(export_path, 'rb') as f:
+            st.download_button(
+                label=f"下载{export_format}文件",
+                data=f,
+                file_name=f"course_ratings_filtered.{extension}",
+                mime=mime
+            )
 
 # 教师评分排名
 st.subheader("👨‍🏫 教师评分排名")
 
 # 计算教师评分（显示所有教师）
-teacher_scores = filtered_df.groupby(['teacher_id', 'Teacher Name']).agg({
-    'total_score': ['mean', 'count'],
-    'Business Category': 'first'
-}).reset_index()
+teacher_scores = filtered_cube.rollup(['teacher_id', 'Teacher Name'], ['total_score'], first=['Business Category'])
+teacher_scores = teacher_scores[['teacher_id', 'Teacher Name', 'total_score', 'total_score_count', 'Business Category']]
 teacher_scores.columns = ['教师ID', '教师姓名', '平均分', '课程数', '业务分类']
 teacher_scores = teacher_scores.sort_values(['平均分'], ascending=[False])
 
@@ -378,7 +477,7 @@ st.plotly_chart(fig, use_container_width=True)
 
 # 课程评分趋势
 st.subheader("📅 评分趋势")
-daily_scores = filtered_df.groupby(['schedule_start_date'])['total_score'].mean().reset_index()
+daily_scores = filtered_cube.rollup(['schedule_start_date'], ['total_score'])
 y_min = daily_scores['total_score'].min()
 y_max = daily_scores['total_score'].max()
 y_margin = (y_max - y_min) * 0.15 if y_max > y_min else 1
@@ -400,7 +499,7 @@ with st.container():
     st.markdown("## 👨‍🏫 教师相关分析")
     st.markdown("教师业务能力画像、评分分布、趋势等。")
     # 只用教师姓名分组，主业务分类用Business Category
-    teacher_exp_scores = df.groupby('Teacher Name').agg({'total_score':'mean', 'Business Category':'first'}).reset_index()
+    teacher_exp_scores = overview_rollups['teacher_scores']
     fig = px.box(
         teacher_exp_scores,
         x='Business Category',
@@ -412,7 +511,7 @@ with st.container():
     )
     st.plotly_chart(fig, use_container_width=True)
     # 教师评分趋势
-    teacher_trend = df.groupby(['schedule_start_date', 'Teacher Name'])['total_score'].mean().reset_index()
+    teacher_trend = overview_rollups['teacher_trend']
     fig2 = px.line(
         teacher_trend,
         x='schedule_start_date',
@@ -428,7 +527,7 @@ with st.container():
     st.markdown("## 📚 课程与学科分析")
     st.markdown("课程满意度、受欢迎度、分布等。")
     # 课程满意度分布
-    course_scores = df.groupby('course_code')['total_score'].mean().reset_index()
+    course_scores = overview_rollups['course_scores']
     fig3 = px.bar(
         course_scores,
         x='course_code',
@@ -440,7 +539,7 @@ with st.container():
     )
     st.plotly_chart(fig3, use_container_width=True)
     # 课程受欢迎度（选课人数）
-    course_pop = df.groupby('course_code')['student_id'].nunique().reset_index().rename(columns={'student_id':'选课人数'})
+    course_pop = overview_rollups['course_popularity']
     fig4 = px.bar(
         course_pop,
         x='course_code',
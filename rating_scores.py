@@ -0,0 +1,56 @@
+import itertools
+import numpy as np
+
+# 每次抽取并转换评分的会话数：评分矩阵及其转换结果只按块保留，内存占用与会话总数无关
+SCORE_CHUNKSIZE = 50_000
+
+def draw_score_matrices(n, rng, weights, criteria, low=6.0, high=9.5):
+    """一次性为 n 节课抽取全部评分
+
+    weights 为 {维度: 权重}，criteria 为 {维度: 细则索引列表}，维度顺序以 weights 为准。
+    返回 (维度分矩阵 n×维度数, {维度: 细则分矩阵 n×细则数}, 总分向量)：
+    维度分在 [low, high] 区间均匀分布，细则分在维度分 ±0.5 区间内，均保留一位小数；
+    总分为维度分矩阵与权重向量的乘积。
+    """
+    categories = list(weights)
+    weight_vector = np.array([weights[cat] for cat in categories])
+    category_scores = np.round(rng.uniform(low, high, size=(n, len(categories))), 1)
+    criteria_scores = {}
+    for j, cat in enumerate(categories):
+        center = category_scores[:, j:j + 1]
+        size = (n, len(criteria[cat]))
+        criteria_scores[cat] = np.round(rng.uniform(center - 0.5, center + 0.5, size=size), 1)
+    total_scores = np.round(category_scores @ weight_vector, 1)
+    return category_scores, criteria_scores, total_scores
+
+def iter_rating_fields(criteria, category_scores, criteria_scores, total_scores):
+    """写出时才将评分矩阵逐条转换为紧凑格式的 ratings 字段"""
+    categories = list(criteria_scores)
+    criteria_keys = [criteria[cat] for cat in categories]
+    criteria_rows = [criteria_scores[cat].tolist() for cat in categories]
+    for total_score, category_row, *criteria_row in zip(total_scores.tolist(), category_scores.tolist(), *criteria_rows):
+        yield {
+            'ratings': {
+                cat: {'score': score, 'criteria': dict(zip(keys, values))}
+                for cat, keys, score, values in zip(categories, criteria_keys, category_row, criteria_row)
+            },
+            'total_score': total_score
+        }
+
+def iter_session_ratings(sessions, rng, weights, criteria, chunksize=SCORE_CHUNKSIZE):
+    """为会话流按块抽取评分，逐条产出 (会话, ratings 字段)"""
+    sessions = iter(sessions)
+    while True:
+        chunk = list(itertools.islice(sessions, chunksize))
+        if not chunk:
+            return
+        yield from zip(chunk, iter_rating_fields(criteria, *draw_score_matrices(len(chunk), rng, weights, criteria)))
+
+def score_columns(criteria, category_scores, criteria_scores, total_scores):
+    """将评分矩阵直接转换为展开后宽表的评分列（与 flatten_ratings_compact 的列顺序一致，float32）"""
+    columns = {'total_score': total_scores.astype(np.float32)}
+    for j, cat in enumerate(criteria_scores):
+        columns[f'{cat}_score'] = category_scores[:, j].astype(np.float32)
+        for k, cidx in enumerate(criteria[cat]):
+            columns[f'{cat}_{cidx}'] = criteria_scores[cat][:, k].astype(np.float32)
+    return columns
@@ -0,0 +1,438 @@
+import itertools
+import json
+import os
+import shutil
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+# 课程时间字段，展开后列名为 schedule_<字段>
+SCHEDULE_FIELDS = ['start_date', 'start_time', 'end_time', 'duration_minutes']
+
+# 会话基础信息字段
+BASE_FIELDS = ['session_id', 'student_id', 'teacher_id', 'course_code']
+
+# 以分类编码存储的 ID 列
+ID_COLUMNS = ['student_id', 'teacher_id', 'course_code']
+
+# 评分明细（原始 JSON / 按行分隔的 NDJSON）与展开后的列式存储
+RATINGS_JSON = 'course_ratings_compact.json'
+RATINGS_NDJSON = 'course_ratings_compact.ndjson'
+RATINGS_STORE = 'course_ratings.parquet'
+
+# 追加日志目录：新增会话以 NDJSON 分段写入，定期合并进列式存储
+RATINGS_LOG_DIR = 'ratings_log'
+
+# 合并中的分段：合并前先移入追加日志下的此目录，全部写完后才删除
+COMPACTING_DIR = 'compacting'
+
+# NDJSON 每次读取并展开的记录数
+DEFAULT_CHUNKSIZE = 50_000
+
+def load_ratings_meta(path='ratings_meta.json'):
+    """加载评分元数据（维度、权重、细则索引）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def rating_columns(ratings_meta):
+    """按评分元数据给出展开后的评分列：每个维度一列 {cat}_score，每条细则一列 {cat}_{Cn}"""
+    columns = []
+    for cat, cat_info in ratings_meta.items():
+        columns.append(f'{cat}_score')
+        columns.extend(f'{cat}_{cidx}' for cidx in cat_info['criteria'])
+    return columns
+
+def _column(records, key, dtype, default=None):
+    """从记录列表中取出 key 对应的值，构建为指定类型的数组
+
+    优先走 itemgetter 快速路径；若有记录缺少该字段，再逐条取值并以 default 填充。
+    """
+    try:
+        values = map(itemgetter(key), records)
+        if dtype is object:
+            return np.array(list(values), dtype=object)
+        return np.fromiter(values, dtype=dtype, count=len(records))
+    except KeyError:
+        values = [record.get(key, default) for record in records]
+        return np.array(values, dtype=dtype)
+
+def flatten_ratings_compact(ratings, ratings_meta):
+    """将紧凑评分记录展开为宽表
+
+    列集合由评分元数据事先确定，每一列直接构建为定长的类型化数组，
+    不再为每条记录构建中间字典。缺失的维度或细则记为 NaN。
+    """
+    columns = {}
+    for field in BASE_FIELDS:
+        columns[field] = _column(ratings, field, object)
+
+    schedules = list(map(itemgetter('schedule'), ratings))
+    for field in SCHEDULE_FIELDS:
+        dtype = np.int64 if field == 'duration_minutes' else object
+        columns[f'schedule_{field}'] = _column(schedules, field, dtype)
+
+    scores = list(map(itemgetter('ratings'), ratings))
+    columns['total_score'] = _column(scores, 'total_score', np.float64, np.nan)
+
+    # 按维度展开：先取出每条记录该维度的信息，再逐列生成数组
+    categories = list(map(itemgetter('ratings'), scores))
+    for cat, cat_info in ratings_meta.items():
+        cat_infos = [c.get(cat, {}) for c in categories]
+        columns[f'{cat}_score'] = _column(cat_infos, 'score', np.float64, np.nan)
+        criteria = [info.get('criteria', {}) for info in cat_infos]
+        for cidx in cat_info['criteria']:
+            columns[f'{cat}_{cidx}'] = _column(criteria, cidx, np.float64, np.nan)
+
+    return pd.DataFrame(columns, copy=False)
+
+def to_columnar(df):
+    """压缩宽表的存储类型：ID 列转为分类编码，评分列转为 float32（原地修改并返回）"""
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in df.select_dtypes('float64').columns:
+        df[col] = df[col].astype(np.float32)
+    return df
+
+# 评分的存储精度（小数位数）
+SCORE_DECIMALS = 1
+
+def widen_scores(values):
+    """float32 评分转回 float64 并按存储精度取整，避免展示为 8.199999809 之类的值"""
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return np.round(values.astype(np.float64), SCORE_DECIMALS)
+    return values.astype(np.float64)
+
+def widen_score_columns(df):
+    """宽表中 float32 的评分列转回 float64（返回新表，不修改原表），用于展示与导出"""
+    columns = df.select_dtypes('float32').columns
+    return df.assign(**{col: widen_scores(df[col]) for col in columns}) if len(columns) else df
+
+def concat_ratings_frames(frames):
+    """拼接多个列式分块，ID 列合并分类后仍保持分类编码"""
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    for col in ID_COLUMNS:
+        # 投影读取时可能不含某些 ID 列，只统一所有分块都有且均为分类编码的列
+        if all(col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = frames[0][col].cat.categories
+            for frame in frames[1:]:
+                categories = categories.union(frame[col].cat.categories)
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def iter_ndjson(path):
+    """逐行读取 NDJSON 文件，每行一条记录，跳过空行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_record_chunks(records, chunksize=DEFAULT_CHUNKSIZE):
+    """将记录流按固定大小分块，每块最多 chunksize 条记录"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_ndjson_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """按固定大小分块读取 NDJSON，每块最多 chunksize 条记录"""
+    return iter_record_chunks(iter_ndjson(path), chunksize)
+
+def iter_records(path):
+    """读取评分记录：.ndjson/.jsonl 逐行流式读取，其余按 JSON 数组整体读取"""
+    if str(path).endswith(('.ndjson', '.jsonl')):
+        yield from iter_ndjson(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+# 流式写出记录时使用紧凑分隔符，省去缩进与多余空格
+COMPACT_SEPARATORS = (',', ':')
+
+class RecordWriter:
+    """逐条流式写出评分记录，内存中不保留已写出的记录
+
+    ndjson 为 None 时按扩展名判断：.ndjson/.jsonl 写为 NDJSON，其余写为 JSON 数组（每条记录一行）。
+    先写入 path.tmp，正常结束时才替换目标文件；出错时丢弃临时文件，原有数据保持不变。
+    """
+
+    def __init__(self, path, ndjson=None):
+        self.ndjson = str(path).endswith(('.ndjson', '.jsonl')) if ndjson is None else ndjson
+        self.count = 0
+        self.path = path
+        self._file = open(f'{path}.tmp', 'w', encoding='utf-8')
+        if not self.ndjson:
+            self._file.write('[')
+
+    def write(self, record):
+        if not self.ndjson:
+            self._file.write(',\n' if self.count else '\n')
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=COMPACT_SEPARATORS))
+        if self.ndjson:
+            self._file.write('\n')
+        self.count += 1
+
+    def passthrough(self, records):
+        """逐条写出记录并原样交给下游，便于同一遍中再做展开等处理"""
+        for record in records:
+            self.write(record)
+            yield record
+
+    def close(self):
+        """写完收尾并替换目标文件"""
+        if not self.ndjson:
+            self._file.write('\n]\n' if self.count else ']\n')
+        self._file.close()
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def abort(self):
+        """放弃写出，删除临时文件"""
+        self._file.close()
+        os.remove(f'{self.path}.tmp')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_records(records, path, ndjson=None):
+    """将评分记录逐条流式写出，返回写出的条数"""
+    with RecordWriter(path, ndjson) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+def write_ndjson(records, path):
+    """将评分记录逐条写为 NDJSON"""
+    return write_records(records, path, ndjson=True)
+
+def iter_ratings_frames(path, ratings_meta, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """分块读取 NDJSON 并逐块展开为列式宽表，内存中只保留当前块的原始记录"""
+    for chunk in iter_ndjson_chunks(path, chunksize):
+        frame = to_columnar(flatten_ratings_compact(chunk, ratings_meta))
+        yield frame[columns] if columns is not None else frame
+
+def load_ratings_ndjson(path, ratings_meta, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """流式加载 NDJSON 评分文件为列式宽表"""
+    frames = list(iter_ratings_frames(path, ratings_meta, columns, chunksize))
+    if not frames:
+        return to_columnar(flatten_ratings_compact([], ratings_meta))
+    return concat_ratings_frames(frames)
+
+def write_ratings_store(df, path=RATINGS_STORE):
+    """将展开后的宽表写入列式存储（Parquet，需要 pyarrow）"""
+    to_columnar(df).to_parquet(path, index=False, compression='zstd')
+
+def read_ratings_store(path=RATINGS_STORE, columns=None):
+    """从列式存储读取宽表，columns 指定时只读取这些列，ID 列读为分类编码"""
+    import pyarrow.parquet as pq
+    read_dictionary = [col for col in ID_COLUMNS if columns is None or col in columns]
+    return pq.read_table(path, columns=columns, read_dictionary=read_dictionary).to_pandas()
+
+def records_to_store(records, ratings_meta, store_path=RATINGS_STORE, chunksize=DEFAULT_CHUNKSIZE):
+    """分块将评分记录流展开并写入列式存储，每块写为一个 row group，内存占用与记录总数无关"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # 先写临时文件，全部写完才替换，出错时不会留下只含部分数据的存储
+    tmp_path = f'{store_path}.tmp'
+    writer = None
+    total = 0
+    try:
+        for chunk in iter_record_chunks(records, chunksize):
+            frame = to_columnar(flatten_ratings_compact(chunk, ratings_meta))
+            # 各块的分类编码不同，写入时统一为字符串，由 Parquet 做字典编码
+            for col in ID_COLUMNS:
+                frame[col] = frame[col].astype(object)
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+            writer.write_table(table)
+            total += len(frame)
+            # 读取下一块前释放本块，内存中最多只有一块记录
+            del chunk, frame, table
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is None:
+        write_ratings_store(flatten_ratings_compact([], ratings_meta), tmp_path)
+    else:
+        writer.close()
+    os.replace(tmp_path, store_path)
+    return total
+
+def ndjson_to_store(ndjson_path, ratings_meta, store_path=RATINGS_STORE, chunksize=DEFAULT_CHUNKSIZE):
+    """分块将 NDJSON 转为列式存储"""
+    return records_to_store(iter_ndjson(ndjson_path), ratings_meta, store_path, chunksize)
+
+def load_ratings_frame(ratings_meta, columns=None, json_path=RATINGS_JSON,
+                       ndjson_path=RATINGS_NDJSON, store_path=RATINGS_STORE, chunksize=DEFAULT_CHUNKSIZE):
+    """加载展开后的评分宽表
+
+    列式存储存在且不旧于原始数据时直接按列读取；否则（或未安装 pyarrow 时）
+    优先分块流式读取 NDJSON，最后回退到解析 JSON 并展开。
+    """
+    sources = [path for path in (ndjson_path, json_path) if os.path.exists(path)]
+    if os.path.exists(store_path) and all(
+            os.path.getmtime(store_path) >= os.path.getmtime(path) for path in sources):
+        try:
+            return read_ratings_store(store_path, columns)
+        except ImportError:
+            pass
+    if os.path.exists(ndjson_path):
+        return load_ratings_ndjson(ndjson_path, ratings_meta, columns, chunksize)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        ratings = json.load(f)
+    df = to_columnar(flatten_ratings_compact(ratings, ratings_meta))
+    return df[columns] if columns is not None else df
+
+def enrich_ratings_frame(df, teachers_df, students_df, courses_df):
+    """合并教师、学生、课程信息，课程所属学科作为业务分类（Business Category）"""
+    # 合并教师信息
+    df = df.merge(teachers_df[['Teacher ID', 'Expertise', 'Teacher Name']],
+                  left_on='teacher_id',
+                  right_on='Teacher ID',
+                  how='left')
+    # 合并学生信息
+    df = df.merge(students_df[['Student ID', 'Student Name']],
+                  left_on='student_id',
+                  right_on='Student ID',
+                  how='left')
+    # 合并课程信息，添加Department字段（唯一业务分类）
+    df = df.merge(courses_df[['Course Code', 'Department']],
+                  left_on='course_code',
+                  right_on='Course Code',
+                  how='left')
+    return df.rename(columns={'Department': 'Business Category'})
+
+def list_segments(log_dir=RATINGS_LOG_DIR):
+    """按写入顺序列出追加日志中的分段文件"""
+    if not os.path.isdir(log_dir):
+        return []
+    return sorted(
+        os.path.join(log_dir, name) for name in os.listdir(log_dir)
+        if name.startswith('segment-') and name.endswith('.ndjson')
+    )
+
+def list_compacting_segments(log_dir=RATINGS_LOG_DIR):
+    """列出合并中的分段：上次合并中断时留下，其中的会话可能已写入原始数据"""
+    return list_segments(os.path.join(log_dir, COMPACTING_DIR))
+
+def drop_compacted(frame, base):
+    """去掉已写入原始数据的会话，用于合并中的分段"""
+    return frame[~frame['session_id'].isin(base['session_id'])]
+
+def append_segment(sessions, log_dir=RATINGS_LOG_DIR):
+    """将新增会话写为追加日志中的一个新分段，RecordWriter 先写临时文件再重命名，读取方不会看到半个分段"""
+    os.makedirs(log_dir, exist_ok=True)
+    # 编号同时避开合并中的分段，中断的合并重试时不会与新分段同名
+    segments = sorted(map(os.path.basename, list_segments(log_dir) + list_compacting_segments(log_dir)))
+    next_id = int(segments[-1][len('segment-'):-len('.ndjson')]) + 1 if segments else 1
+    path = os.path.join(log_dir, f'segment-{next_id:06d}.ndjson')
+    write_ndjson(sessions, path)
+    return path
+
+def load_segment_frame(path, ratings_meta, columns=None):
+    """加载单个追加分段为列式宽表"""
+    return load_ratings_ndjson(path, ratings_meta, columns)
+
+def load_ratings_history(ratings_meta, columns=None, log_dir=RATINGS_LOG_DIR, **paths):
+    """加载完整评分历史：基础数据加上追加日志中尚未合并的分段
+
+    合并中的分段只保留原始数据中还没有的会话，合并中断时不会重复计数。
+    """
+    compacting = list_compacting_segments(log_dir)
+    read_columns = columns
+    if compacting and columns is not None and 'session_id' not in columns:
+        read_columns = list(columns) + ['session_id']
+    base = load_ratings_frame(ratings_meta, read_columns, **paths)
+    frames = [base]
+    frames.extend(drop_compacted(load_segment_frame(path, ratings_meta, read_columns), base) for path in compacting)
+    frames.extend(load_segment_frame(path, ratings_meta, read_columns) for path in list_segments(log_dir))
+    df = concat_ratings_frames(frames)
+    return df[columns] if columns is not None else df
+
+def append_segments_to_source(segments, json_path=RATINGS_JSON, ndjson_path=RATINGS_NDJSON, skip=()):
+    """将分段中的会话追加到原始评分数据（先写临时文件再替换），返回被更新的文件，没有原始数据时返回 None
+
+    session_id 在 skip 中的会话已写入过原始数据，不再追加。
+    NDJSON 原有内容按字节拷贝；JSON 数组需整体解析后逐条写出。
+    """
+    skip = set(skip)
+    records = (record for record in itertools.chain(*map(iter_ndjson, segments)) if record['session_id'] not in skip)
+    if os.path.exists(ndjson_path):
+        with open(f'{ndjson_path}.tmp', 'wb') as out:
+            with open(ndjson_path, 'rb') as f:
+                shutil.copyfileobj(f, out)
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        out.write(b'\n')
+            for record in records:
+                out.write((json.dumps(record, ensure_ascii=False, separators=COMPACT_SEPARATORS) + '\n').encode('utf-8'))
+        os.replace(f'{ndjson_path}.tmp', ndjson_path)
+        return ndjson_path
+    if os.path.exists(json_path):
+        write_records(itertools.chain(iter_records(json_path), records), json_path)
+        return json_path
+    return None
+
+def compact_ratings_log(ratings_meta, log_dir=RATINGS_LOG_DIR, store_path=RATINGS_STORE,
+                        json_path=RATINGS_JSON, ndjson_path=RATINGS_NDJSON):
+    """合并追加日志：分段同时并入原始评分数据与列式存储，之后删除已合并的分段
+
+    列式存储只是原始数据的缓存，原始数据更新（或被重新检出）时看板会改读原始数据，
+    因此分段必须也写进原始数据，否则已合并的会话会丢失。
+    分段先移入 compacting/ 再写原始数据：中途中断后，读取与重试合并都按 session_id
+    跳过原始数据中已有的会话，重复执行合并不会产生重复会话。
+    """
+    compacting_dir = os.path.join(log_dir, COMPACTING_DIR)
+    os.makedirs(compacting_dir, exist_ok=True)
+    for path in list_segments(log_dir):
+        os.replace(path, os.path.join(compacting_dir, os.path.basename(path)))
+    segments = list_segments(compacting_dir)
+    if not segments:
+        os.rmdir(compacting_dir)
+        return 0
+    base = load_ratings_frame(ratings_meta, json_path=json_path, ndjson_path=ndjson_path, store_path=store_path)
+    frames = [base]
+    frames.extend(drop_compacted(load_segment_frame(path, ratings_meta), base) for path in segments)
+    write_ratings_store(concat_ratings_frames(frames), f'{store_path}.tmp')
+    append_segments_to_source(segments, json_path, ndjson_path, skip=base['session_id'])
+    os.replace(f'{store_path}.tmp', store_path)
+    # 存储的修改时间须不早于原始数据，否则会被当作过期缓存
+    os.utime(store_path)
+    for path in segments:
+        os.remove(path)
+    os.rmdir(compacting_dir)
+    return len(segments)
+
+def build_ratings_store(json_path=RATINGS_JSON, ndjson_path=RATINGS_NDJSON,
+                        store_path=RATINGS_STORE, meta_path='ratings_meta.json'):
+    """由现有的评分数据生成列式存储，存在 NDJSON 时分块流式转换"""
+    ratings_meta = load_ratings_meta(meta_path)
+    if os.path.exists(ndjson_path):
+        total = ndjson_to_store(ndjson_path, ratings_meta, store_path)
+    else:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            ratings = json.load(f)
+        write_ratings_store(flatten_ratings_compact(ratings, ratings_meta), store_path)
+        total = len(ratings)
+    print(f"已生成列式评分存储 {store_path}，共{total}条")
+
+if __name__ == "__main__":
+    build_ratings_store()
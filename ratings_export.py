@@ -0,0 +1,56 @@
+import gzip
+import os
+from ratings_data import widen_score_columns
+
+# 每次导出的行数，导出时内存中只保留当前块
+EXPORT_CHUNKSIZE = 50_000
+
+# 导出格式：显示名 -> (文件扩展名, MIME 类型)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+def iter_chunks(df, rows, columns, chunksize=EXPORT_CHUNKSIZE):
+    """按行号分块取出待导出的列，评分列转回 float64"""
+    for start in range(0, len(rows), chunksize):
+        yield widen_score_columns(df.iloc[rows[start:start + chunksize]][columns])
+
+def iter_csv_chunks(df, rows, columns, chunksize=EXPORT_CHUNKSIZE):
+    """分块生成 CSV 字节串，首块带表头"""
+    for i, chunk in enumerate(iter_chunks(df, rows, columns, chunksize)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode('utf-8')
+    if len(rows) == 0:
+        yield df.iloc[:0][columns].to_csv(index=False).encode('utf-8')
+
+def write_csv_export(df, rows, columns, path, compress=False, chunksize=EXPORT_CHUNKSIZE):
+    """分块写出 CSV，compress 为 True 时写为 gzip 压缩文件"""
+    opener = gzip.open if compress else open
+    with opener(path, 'wb') as f:
+        for data in iter_csv_chunks(df, rows, columns, chunksize):
+            f.write(data)
+
+def write_parquet_export(df, rows, columns, path, chunksize=EXPORT_CHUNKSIZE):
+    """分块写出 Parquet（zstd 压缩），每块一个 row group"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # 以首块推断列类型，首块中全为空的文本列按字符串处理，保证后续各块类型一致
+    first = widen_score_columns(df.iloc[rows[:chunksize]][columns])
+    schema = pa.Schema.from_pandas(first, preserve_index=False)
+    schema = pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema
+    ])
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in iter_chunks(df, rows, columns, chunksize):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def write_export(df, rows, columns, export_format, output_dir, name):
+    """按导出格式写出文件，返回文件路径"""
+    extension, _ = EXPORT_FORMATS[export_format]
+    path = os.path.join(output_dir, f'{name}.{extension}')
+    if export_format == 'Parquet':
+        write_parquet_export(df, rows, columns, path)
+    else:
+        write_csv_export(df, rows, columns, path, compress=(export_format == 'CSV (gzip)'))
+    return path
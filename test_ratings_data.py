@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+from pathlib import Path
+import pytest
+import ratings_data
+from ratings_data import (
+    load_ratings_meta, load_ratings_history, append_segment, compact_ratings_log, iter_records, write_records,
+    list_compacting_segments, RATINGS_JSON, RATINGS_NDJSON
+)
+
+REPO_DIR = Path(__file__).parent
+
+@pytest.fixture(params=[RATINGS_JSON, RATINGS_NDJSON])
+def data_dir(request, tmp_path, monkeypatch):
+    """在临时目录中准备一份小规模评分数据（前 50 条为原始数据，后 10 条作为新增会话），原始数据分别为 JSON 与 NDJSON"""
+    with open(REPO_DIR / RATINGS_JSON, 'r', encoding='utf-8') as f:
+        ratings = json.load(f)[:60]
+    shutil.copy(REPO_DIR / 'ratings_meta.json', tmp_path / 'ratings_meta.json')
+    write_records(ratings[:50], tmp_path / request.param)
+    monkeypatch.chdir(tmp_path)
+    append_segment(ratings[50:])
+    return tmp_path
+
+def history_ids():
+    return load_ratings_history(load_ratings_meta())['session_id'].tolist()
+
+def source_ids():
+    source = RATINGS_NDJSON if os.path.exists(RATINGS_NDJSON) else RATINGS_JSON
+    return [record['session_id'] for record in iter_records(source)]
+
+@pytest.mark.parametrize('crash_in', ['append_segments_to_source', 'utime'])
+def test_compact_retry_after_crash(data_dir, monkeypatch, crash_in):
+    expected = history_ids()
+    assert len(expected) == 60
+
+    # 模拟进程在原始数据已更新、分段尚未删除时中断
+    if crash_in == 'append_segments_to_source':
+        append = ratings_data.append_segments_to_source
+
+        def crash(*args, **kwargs):
+            append(*args, **kwargs)
+            raise KeyboardInterrupt
+        monkeypatch.setattr(ratings_data, 'append_segments_to_source', crash)
+    else:
+        def crash(*args, **kwargs):
+            raise KeyboardInterrupt
+        monkeypatch.setattr(ratings_data.os, 'utime', crash)
+    with pytest.raises(KeyboardInterrupt):
+        compact_ratings_log(load_ratings_meta())
+    monkeypatch.undo()
+    os.chdir(data_dir)
+
+    assert list_compacting_segments()
+    assert sorted(history_ids()) == sorted(expected)
+
+    # 中断期间写入的新分段不与合并中的分段重名
+    with open(REPO_DIR / RATINGS_JSON, 'r', encoding='utf-8') as f:
+        append_segment([{**json.load(f)[0], 'session_id': 'NEW001'}])
+
+    assert compact_ratings_log(load_ratings_meta()) == 2
+    assert not os.path.exists(os.path.join('ratings_log', 'compacting'))
+    assert sorted(source_ids()) == sorted(expected + ['NEW001'])
+    assert sorted(history_ids()) == sorted(expected + ['NEW001'])